@@ -45,3 +45,13 @@ def few_posts_with_group(mixer, user, group):
 def another_few_posts_with_group_with_follower(mixer, user, another_user, group):
     mixer.blend('posts.Follow', user=user, author=another_user)
     mixer.cycle(20).blend(Post, author=another_user, group=group)
+
+
+@pytest.fixture
+def group_1():
+    return Group.objects.create(title='Группа 1', slug='group_1', description='Описание группы 1')
+
+
+@pytest.fixture
+def group_2():
+    return Group.objects.create(title='Группа 2', slug='group_2', description='Описание группы 2')
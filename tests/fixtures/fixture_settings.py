@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def isolated_caches(tmp_path_factory):
+    from core.testing import isolated_settings
+    with isolated_settings(str(tmp_path_factory.mktemp('caches'))):
+        yield
@@ -0,0 +1,121 @@
+"""Обвязка JSON-эндпоинтов: методы, тело запроса, JWT и ошибки."""
+import json
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, QueryDict
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from users.backends import CachedModelBackend
+
+from . import jwt
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ApiError(Exception):
+    """Ответ с ошибкой: status и тело {'detail': ..., **fields}."""
+
+    def __init__(self, status, detail=None, **fields):
+        super().__init__(detail)
+        self.status = status
+        self.data = fields
+        if detail is not None:
+            self.data['detail'] = detail
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        safe=False,
+        encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+def request_data(request):
+    """Тело запроса: JSON или форма, в том числе для PUT и PATCH."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            raise ApiError(400, 'Некорректный JSON')
+        if not isinstance(data, dict):
+            raise ApiError(400, 'Ожидается объект JSON')
+        return data
+    if request.method == 'POST':
+        return request.POST
+    return QueryDict(request.body)
+
+
+def authenticate(request):
+    """Пользователь из access-токена или None для гостя.
+
+    Сессия не используется: токен подписан и несёт id, а пользователь
+    берётся из кеша, поэтому токен удалённого пользователя отвергается.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION')
+    if not header:
+        return None
+    scheme, _, token = header.partition(' ')
+    if scheme not in ('Bearer', 'JWT') or not token:
+        raise ApiError(
+            401,
+            'Ожидается заголовок Authorization: Bearer <token>',
+            code='bad_authorization_header',
+        )
+    try:
+        user_id = jwt.decode(token.strip(), jwt.ACCESS)['user_id']
+    except jwt.TokenError as error:
+        raise ApiError(401, str(error), code=error.code)
+    user = CachedModelBackend().get_user(user_id)
+    if user is None:
+        raise ApiError(
+            401, 'Пользователь не найден', code='user_not_found'
+        )
+    return user
+
+
+def _check(request, methods, login_required, public):
+    """Проверяет метод и токен, кладёт пользователя в request."""
+    if request.method not in methods:
+        raise ApiError(405, f'Метод {request.method} не разрешён')
+    user = None if public else authenticate(request)
+    request.user_id = user.pk if user else None
+    if user is not None:
+        request.user = user
+    if not public and user is None and (
+            login_required or request.method not in SAFE_METHODS
+    ):
+        raise ApiError(401, 'Нужна авторизация по токену')
+
+
+def api_view(*methods, login_required=False, public=False):
+    """JSON-эндпоинт, разрешающий только methods (GET включает HEAD).
+
+    В request.user и request.user_id кладётся владелец JWT; изменяющие методы и
+    login_required требуют токен, public-эндпоинты (выдача токенов)
+    заголовок Authorization не читают. Http404 и ApiError становятся
+    JSON-ответами. CSRF не нужен: cookie API не читает.
+    """
+    if 'GET' in methods:
+        methods += ('HEAD',)
+
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                _check(request, methods, login_required, public)
+                response = view(request, *args, **kwargs)
+            except ApiError as error:
+                response = json_response(error.data, error.status)
+            except Http404:
+                response = json_response({'detail': 'Не найдено'}, 404)
+            if response.status_code == 405:
+                response['Allow'] = ', '.join(methods)
+            patch_vary_headers(response, ('Authorization',))
+            return response
+        return wrapper
+    return decorator
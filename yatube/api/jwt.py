@@ -0,0 +1,94 @@
+"""JWT (HS256) без сторонних пакетов.
+
+Токен несёт id пользователя и тип (access или refresh), поэтому
+запрос к API аутентифицируется без сессии и без запроса к базе.
+Подпись — HMAC-SHA256 на API_SIGNING_KEY (по умолчанию SECRET_KEY).
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+import uuid
+
+from django.conf import settings
+
+ACCESS = 'access'
+REFRESH = 'refresh'
+HEADER = {'alg': 'HS256', 'typ': 'JWT'}
+INVALID = 'Токен недействителен или просрочен'
+
+
+class TokenError(Exception):
+    """Токен испорчен, подделан, истёк или не того типа."""
+    code = 'token_not_valid'
+
+
+def _b64encode(data) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _key() -> bytes:
+    return getattr(settings, 'API_SIGNING_KEY', settings.SECRET_KEY).encode()
+
+
+def _sign(message) -> str:
+    return _b64encode(
+        hmac.new(_key(), message.encode(), hashlib.sha256).digest()
+    )
+
+
+def _lifetime(token_type):
+    if token_type == ACCESS:
+        return settings.API_ACCESS_TOKEN_LIFETIME
+    return settings.API_REFRESH_TOKEN_LIFETIME
+
+
+def encode(user_id, token_type) -> str:
+    now = int(time.time())
+    payload = {
+        'token_type': token_type,
+        'user_id': user_id,
+        'iat': now,
+        'exp': now + int(_lifetime(token_type).total_seconds()),
+        'jti': uuid.uuid4().hex,
+    }
+    message = '.'.join(
+        _b64encode(json.dumps(part, separators=(',', ':')).encode())
+        for part in (HEADER, payload)
+    )
+    return f'{message}.{_sign(message)}'
+
+
+def decode(token, token_type=None) -> dict:
+    """Проверяет подпись и срок; возвращает полезную нагрузку."""
+    try:
+        header, payload, signature = token.split('.')
+    except (AttributeError, ValueError):
+        raise TokenError(INVALID)
+    if not hmac.compare_digest(_sign(f'{header}.{payload}'), signature):
+        raise TokenError(INVALID)
+    try:
+        header = json.loads(_b64decode(header))
+        payload = json.loads(_b64decode(payload))
+    except ValueError:
+        raise TokenError(INVALID)
+    if (not isinstance(header, dict) or not isinstance(payload, dict)
+            or header.get('alg') != HEADER['alg']
+            or not isinstance(payload.get('exp'), int)
+            or payload['exp'] < time.time()):
+        raise TokenError(INVALID)
+    if token_type is not None and payload.get('token_type') != token_type:
+        raise TokenError('Токен не того типа')
+    return payload
+
+
+def pair(user_id) -> dict:
+    return {
+        'refresh': encode(user_id, REFRESH),
+        'access': encode(user_id, ACCESS),
+    }
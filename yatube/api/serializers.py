@@ -0,0 +1,116 @@
+"""Представление моделей в JSON с выбором полей.
+
+Каждое поле знает, какие колонки и связи ему нужны, поэтому
+queryset() подтягивает select_related и only() ровно под
+запрошенный набор (?fields=id,text).
+"""
+from posts.models import Comment, Follow, Group, Post
+
+from .decorators import ApiError
+
+
+class Field:
+    def __init__(self, columns, get=None, related=None):
+        self.columns = columns
+        self.get = get or (lambda obj, name=columns[0]: getattr(obj, name))
+        self.related = related
+
+
+class Serializer:
+    model = None
+    fields = {}
+
+    def __init__(self, fields=None):
+        """fields — строка ?fields= через запятую или None для всех."""
+        names = [name.strip() for name in (fields or '').split(',')]
+        names = [name for name in names if name] or list(self.fields)
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(
+                400, 'Неизвестные поля: ' + ', '.join(unknown),
+                code='invalid_fields',
+            )
+        self.selected = {name: self.fields[name] for name in names}
+
+    @classmethod
+    def from_request(cls, request):
+        return cls(request.GET.get('fields'))
+
+    def queryset(self, queryset=None, keys=()):
+        """queryset с колонками выбранных полей и ключами keys."""
+        if queryset is None:
+            queryset = self.model.objects.all()
+        related = {
+            field.related for field in self.selected.values()
+            if field.related
+        }
+        columns = {'pk', *keys}
+        for field in self.selected.values():
+            columns.update(field.columns)
+        return queryset.select_related(*related).only(*columns)
+
+    def to_dict(self, obj) -> dict:
+        return {name: field.get(obj) for name, field in self.selected.items()}
+
+    def many(self, objects) -> list:
+        return [self.to_dict(obj) for obj in objects]
+
+
+class GroupSerializer(Serializer):
+    model = Group
+    fields = {
+        'id': Field(('id',)),
+        'title': Field(('title',)),
+        'slug': Field(('slug',)),
+        'description': Field(('description',)),
+    }
+
+
+class PostSerializer(Serializer):
+    model = Post
+    fields = {
+        'id': Field(('id',)),
+        'text': Field(('text',)),
+        'pub_date': Field(('pub_date',)),
+        'author': Field(
+            ('author', 'author__username'),
+            lambda post: post.author.username,
+            related='author',
+        ),
+        'group': Field(('group',), lambda post: post.group_id),
+        'image': Field(
+            ('image',), lambda post: post.image.url if post.image else None
+        ),
+        'comments_count': Field(('comments_count',)),
+    }
+
+
+class CommentSerializer(Serializer):
+    model = Comment
+    fields = {
+        'id': Field(('id',)),
+        'author': Field(
+            ('author', 'author__username'),
+            lambda comment: comment.author.username,
+            related='author',
+        ),
+        'post': Field(('post',), lambda comment: comment.post_id),
+        'text': Field(('text',)),
+        'created': Field(('created',)),
+    }
+
+
+class FollowSerializer(Serializer):
+    model = Follow
+    fields = {
+        'user': Field(
+            ('user', 'user__username'),
+            lambda follow: follow.user.username,
+            related='user',
+        ),
+        'following': Field(
+            ('author', 'author__username'),
+            lambda follow: follow.author.username,
+            related='author',
+        ),
+    }
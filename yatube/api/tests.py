@@ -0,0 +1,145 @@
+import json
+from http import HTTPStatus
+
+from django.test import TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='author', password='password123'
+        )
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Пост номер {i}')
+            for i in range(15)
+        )
+        cls.post = Post.objects.latest('pub_date', 'id')
+
+    def setUp(self):
+        response = self.client.post(reverse('api:token_create'), {
+            'username': 'author', 'password': 'password123',
+        })
+        token = response.json()['access']
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def send(self, method, url, data=None, **extra):
+        return getattr(self.client, method)(
+            url, json.dumps(data or {}), content_type='application/json',
+            **{**self.auth, **extra},
+        )
+
+    def test_posts_cursor_pagination_and_fields(self):
+        """Список постов по курсору с выбранными полями."""
+        url = reverse('api:post_list')
+        with self.assertNumQueries(1):
+            first = self.client.get(url, {'fields': 'id,author'}).json()
+        self.assertEqual(len(first['results']), 10)
+        self.assertEqual(
+            first['results'][0], {'id': self.post.pk, 'author': 'author'}
+        )
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+        response = self.client.get(url, {'fields': 'password'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_etag(self):
+        """Повтор с If-None-Match получает 304."""
+        url = reverse('api:group_list')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_write_requires_token_and_ownership(self):
+        """Писать можно с токеном и только своё."""
+        url = reverse('api:post_list')
+        data = {'text': 'Пост через API', 'group': self.group.pk}
+        self.assertEqual(
+            self.client.post(url, data).status_code, HTTPStatus.UNAUTHORIZED
+        )
+        response = self.send('post', url, data)
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertEqual(response.json()['author'], 'author')
+        post = Post.objects.create(author=self.other, text='Чужой пост тут')
+        response = self.send(
+            'patch', reverse('api:post_detail', args=[post.pk]), {'text': 'x'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        response = self.send(
+            'patch',
+            reverse('api:post_detail', args=[self.post.pk]),
+            {'text': 'Новый текст поста'},
+        )
+        self.assertEqual(response.json()['text'], 'Новый текст поста')
+        self.assertEqual(response.json()['group'], self.group.pk)
+
+    def test_comments(self):
+        """Комментарии поста: создание и список."""
+        url = reverse('api:comment_list', args=[self.post.pk])
+        response = self.send('post', url, {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        results = self.client.get(url).json()['results']
+        self.assertEqual(
+            [comment['text'] for comment in results], ['Комментарий']
+        )
+        self.assertTrue(Comment.objects.filter(post=self.post).exists())
+
+    def test_follow_idempotent(self):
+        """Подписка через API идемпотентна и требует токен."""
+        url = reverse('api:follow_list')
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.UNAUTHORIZED
+        )
+        response = self.send('post', url, {'following': 'other'})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        response = self.send('post', url, {'following': 'other'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            self.client.get(url, **self.auth).json(),
+            [{'user': 'author', 'following': 'other'}],
+        )
+        response = self.send('post', url, {'following': 'author'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        response = self.send(
+            'delete', reverse('api:follow_detail', args=['other'])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_bad_token(self):
+        """Испорченный токен — 401 с кодом ошибки."""
+        response = self.client.get(
+            reverse('api:post_list'), HTTP_AUTHORIZATION='Bearer abc.def.ghi'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        self.assertEqual(response.json()['code'], 'token_not_valid')
+
+    def test_bad_group_filter(self):
+        """Нечисловой id группы в фильтре — 400, а не 500."""
+        response = self.client.get(reverse('api:post_list'), {'group': 'abc'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('group', response.json())
+
+    def test_token_of_deleted_user(self):
+        """Токен удалённого пользователя отвергается."""
+        user = User.objects.create_user(username='gone', password='pass1234')
+        token = self.client.post(reverse('api:token_create'), {
+            'username': 'gone', 'password': 'pass1234',
+        }).json()['access']
+        user.delete()
+        response = self.client.post(
+            reverse('api:follow_list'),
+            json.dumps({'following': 'author'}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {token}',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        self.assertEqual(response.json()['code'], 'user_not_found')
@@ -0,0 +1,31 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('v1/jwt/create/', views.token_create, name='token_create'),
+    path('v1/jwt/refresh/', views.token_refresh, name='token_refresh'),
+    path('v1/jwt/verify/', views.token_verify, name='token_verify'),
+    path('v1/posts/', views.post_list, name='post_list'),
+    path('v1/posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'v1/posts/<int:post_id>/comments/',
+        views.comment_list,
+        name='comment_list'
+    ),
+    path(
+        'v1/posts/<int:post_id>/comments/<int:comment_id>/',
+        views.comment_detail,
+        name='comment_detail'
+    ),
+    path('v1/groups/', views.group_list, name='group_list'),
+    path('v1/groups/<int:group_id>/', views.group_detail, name='group_detail'),
+    path('v1/follow/', views.follow_list, name='follow_list'),
+    path(
+        'v1/follow/<str:username>/',
+        views.follow_detail,
+        name='follow_detail'
+    ),
+]
@@ -0,0 +1,267 @@
+"""Эндпоинты API v1."""
+import hashlib
+
+from django.conf import settings
+from django.contrib import auth
+from django.db import transaction
+from django.forms.models import model_to_dict
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Follow, Post, User
+from posts.paginator import CursorPaginator
+
+from . import jwt
+from .decorators import ApiError, api_view, json_response, request_data
+from .serializers import (CommentSerializer, FollowSerializer,
+                          GroupSerializer, PostSerializer)
+
+FORBIDDEN = 'Изменение чужого контента запрещено'
+
+
+def required(data, *names):
+    """Значения обязательных полей; без них — 400 с ошибкой по полю."""
+    errors = {
+        name: ['Обязательное поле.'] for name in names if not data.get(name)
+    }
+    if errors:
+        raise ApiError(400, **errors)
+    return [data[name] for name in names]
+
+
+def etag_response(request, data):
+    """Ответ с ETag: совпавший If-None-Match получает 304 без тела."""
+    response = json_response(data)
+    response['ETag'] = quote_etag(hashlib.md5(response.content).hexdigest())
+    return get_conditional_response(
+        request, etag=response['ETag'], response=response,
+    ) or response
+
+
+def _link(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params.pop('page', None)
+    params['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+
+def paginate(request, queryset, serializer, ordering=('-pub_date', '-id')):
+    """Страница по курсору: {'next', 'previous', 'results'}.
+
+    Размер страницы — ?limit=, не больше API_MAX_PAGE_SIZE.
+    """
+    try:
+        limit = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError(400, 'limit должен быть целым числом')
+    limit = min(max(limit, 1), settings.API_MAX_PAGE_SIZE)
+    keys = tuple(field.lstrip('-') for field in ordering)
+    paginator = CursorPaginator(
+        serializer.queryset(queryset, keys), limit, ordering=ordering,
+    )
+    page = paginator.get_page_from_request(request.GET)
+    return {
+        'next': _link(request, paginator.next_cursor),
+        'previous': _link(request, paginator.previous_cursor),
+        'results': serializer.many(page),
+    }
+
+
+def form_errors(form):
+    return ApiError(400, **form.errors)
+
+
+@transaction.atomic
+def save_post(request, form):
+    if not form.is_valid():
+        raise form_errors(form)
+    post = form.save(commit=False)
+    post.author_id = post.author_id or request.user_id
+    post.save()
+    return PostSerializer().to_dict(post)
+
+
+def own(obj, request):
+    if obj.author_id != request.user_id:
+        raise ApiError(403, FORBIDDEN)
+    return obj
+
+
+def merged(request, obj, fields):
+    """Данные PATCH поверх текущих значений полей объекта."""
+    data = model_to_dict(obj, fields)
+    data.update(request_data(request).items())
+    return data
+
+
+@api_view('POST', public=True)
+def token_create(request):
+    username, password = required(
+        request_data(request), 'username', 'password'
+    )
+    user = auth.authenticate(request, username=username, password=password)
+    if user is None:
+        raise ApiError(
+            401,
+            'Нет активной учётной записи с такими данными',
+            code='no_active_account',
+        )
+    return json_response(jwt.pair(user.pk))
+
+
+@api_view('POST', public=True)
+def token_refresh(request):
+    refresh, = required(request_data(request), 'refresh')
+    try:
+        payload = jwt.decode(refresh, jwt.REFRESH)
+    except jwt.TokenError as error:
+        raise ApiError(401, str(error), code=error.code)
+    return json_response(
+        {'access': jwt.encode(payload['user_id'], jwt.ACCESS)}
+    )
+
+
+@api_view('POST', public=True)
+def token_verify(request):
+    token, = required(request_data(request), 'token')
+    try:
+        jwt.decode(token)
+    except jwt.TokenError as error:
+        raise ApiError(401, str(error), code=error.code)
+    return json_response({})
+
+
+@api_view('GET', 'POST')
+def post_list(request):
+    if request.method == 'POST':
+        form = PostForm(request_data(request), request.FILES or None)
+        return json_response(save_post(request, form), 201)
+    posts = Post.objects.all()
+    group = request.GET.get('group')
+    if group:
+        try:
+            posts = posts.filter(group_id=int(group))
+        except ValueError:
+            raise ApiError(400, group=['Ожидается id группы.'])
+    author = request.GET.get('author')
+    if author:
+        posts = posts.filter(author__username=author)
+    serializer = PostSerializer.from_request(request)
+    return etag_response(request, paginate(request, posts, serializer))
+
+
+@api_view('GET', 'PUT', 'PATCH', 'DELETE')
+def post_detail(request, post_id):
+    if request.method == 'GET':
+        serializer = PostSerializer.from_request(request)
+        post = get_object_or_404(serializer.queryset(), pk=post_id)
+        return etag_response(request, serializer.to_dict(post))
+    post = own(get_object_or_404(Post, pk=post_id), request)
+    if request.method == 'DELETE':
+        post.delete()
+        return HttpResponse(status=204)
+    data = (
+        merged(request, post, ('text', 'group'))
+        if request.method == 'PATCH' else request_data(request)
+    )
+    form = PostForm(data, request.FILES or None, instance=post)
+    return json_response(save_post(request, form))
+
+
+@api_view('GET')
+def group_list(request):
+    serializer = GroupSerializer.from_request(request)
+    groups = serializer.queryset().order_by('title', 'id')
+    return etag_response(request, serializer.many(groups))
+
+
+@api_view('GET')
+def group_detail(request, group_id):
+    serializer = GroupSerializer.from_request(request)
+    group = get_object_or_404(serializer.queryset(), pk=group_id)
+    return etag_response(request, serializer.to_dict(group))
+
+
+@transaction.atomic
+def save_comment(request, form, post_id):
+    if not form.is_valid():
+        raise form_errors(form)
+    comment = form.save(commit=False)
+    comment.post_id = post_id
+    comment.author_id = comment.author_id or request.user_id
+    comment.save()
+    return CommentSerializer().to_dict(comment)
+
+
+@api_view('GET', 'POST')
+def comment_list(request, post_id):
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    if request.method == 'POST':
+        form = CommentForm(request_data(request))
+        return json_response(save_comment(request, form, post_id), 201)
+    return etag_response(request, paginate(
+        request,
+        Comment.objects.filter(post_id=post_id),
+        CommentSerializer.from_request(request),
+        ordering=('created', 'id'),
+    ))
+
+
+@api_view('GET', 'PUT', 'PATCH', 'DELETE')
+def comment_detail(request, post_id, comment_id):
+    if request.method == 'GET':
+        serializer = CommentSerializer.from_request(request)
+        comment = get_object_or_404(
+            serializer.queryset(), pk=comment_id, post_id=post_id
+        )
+        return etag_response(request, serializer.to_dict(comment))
+    comment = own(
+        get_object_or_404(Comment, pk=comment_id, post_id=post_id), request
+    )
+    if request.method == 'DELETE':
+        comment.delete()
+        return HttpResponse(status=204)
+    data = (
+        merged(request, comment, ('text',))
+        if request.method == 'PATCH' else request_data(request)
+    )
+    form = CommentForm(data, instance=comment)
+    return json_response(save_comment(request, form, post_id))
+
+
+@api_view('GET', 'POST', login_required=True)
+def follow_list(request):
+    """Подписки владельца токена; POST {'following': username}."""
+    if request.method == 'POST':
+        username, = required(request_data(request), 'following')
+        author = User.objects.filter(username=username).only('pk').first()
+        if author is None:
+            raise ApiError(400, following=['Пользователь не найден.'])
+        if author.pk == request.user_id:
+            raise ApiError(
+                400, following=['Нельзя подписаться на самого себя.']
+            )
+        with transaction.atomic():
+            created = Follow.objects.follow(request.user_id, author.pk)
+        return json_response(
+            {'user': request.user.username, 'following': username},
+            201 if created else 200,
+        )
+    serializer = FollowSerializer.from_request(request)
+    follows = Follow.objects.filter(user_id=request.user_id)
+    search = request.GET.get('search')
+    if search:
+        follows = follows.filter(author__username__icontains=search)
+    follows = serializer.queryset(follows).order_by('author__username')
+    return etag_response(request, serializer.many(follows))
+
+
+@api_view('DELETE')
+def follow_detail(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    Follow.objects.unfollow(request.user_id, author.pk)
+    return HttpResponse(status=204)
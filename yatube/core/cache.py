@@ -0,0 +1,63 @@
+"""Версионированные ключи кеша.
+
+Каждое пространство имён (лента, группа, профиль) имеет счётчик
+поколения. Ключи фрагментов включают текущее поколение, поэтому
+увеличение счётчика делает старые записи недостижимыми без удаления.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+GENERATION_KEY = 'generation:{}'
+MODIFIED_KEY = 'modified:{}'
+
+
+def _initial() -> int:
+    # Начинаем с метки времени, чтобы потерянный счётчик
+    # не совпал с поколением уже закешированных записей.
+    return int(time.time() * 1000)
+
+
+def generation(*namespaces) -> str:
+    """Возвращает текущее поколение для набора пространств имён."""
+    keys = [GENERATION_KEY.format(namespace) for namespace in namespaces]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, _initial(), None)
+            values[key] = cache.get(key)
+    return '.'.join(str(values[key]) for key in keys)
+
+
+def last_modified(*namespaces) -> float:
+    """Время последнего изменения в пространствах имён (unix time)."""
+    values = cache.get_many(
+        [MODIFIED_KEY.format(namespace) for namespace in namespaces]
+    )
+    return max(values.values(), default=None) or time.time()
+
+
+def _incr(namespaces):
+    for namespace in namespaces:
+        key = GENERATION_KEY.format(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), None)
+    now = time.time()
+    cache.set_many(
+        {MODIFIED_KEY.format(namespace): now for namespace in namespaces},
+        None,
+    )
+
+
+def bump(*namespaces):
+    """Увеличивает поколение пространств имён.
+
+    Поколение увеличивается сразу и ещё раз после коммита транзакции:
+    страница, отрисованная до коммита по старым данным, не останется
+    в кеше под новым поколением.
+    """
+    _incr(namespaces)
+    transaction.on_commit(lambda: _incr(namespaces))
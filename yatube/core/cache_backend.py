@@ -0,0 +1,298 @@
+"""Общий для всех процессов кеш в файле SQLite (режим WAL).
+
+В отличие от LocMemCache записи видны всем воркерам на хосте:
+инвалидация в одном процессе сразу действует в остальных.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import profiling
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL,'
+    ' size INTEGER NOT NULL'
+    ')',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+)
+# Время последнего чтения обновляется не чаще раза в LRU_RESOLUTION
+# секунд, чтобы чтения не превращались в записи.
+LRU_RESOLUTION = 60
+# Максимум переменных в одном запросе SQLite.
+BATCH_SIZE = 500
+
+
+class SQLiteCache(BaseCache):
+    """Кеш с атомарным incr, пакетными get_many/set_many,
+    вытеснением по LRU и размеру и очисткой просроченных записей.
+
+    OPTIONS:
+        MAX_ENTRIES — максимум записей (по умолчанию 300);
+        CULL_FREQUENCY — при переполнении удаляется 1/N записей;
+        MAX_SIZE — максимум байт значений, 0 — без ограничения;
+        SWEEP_INTERVAL — раз в сколько записей проверять лимиты.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 0))
+        self._sweep_interval = int(options.get('SWEEP_INTERVAL', 100))
+        self._writes = 0
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            # Соединение нельзя наследовать после fork.
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(
+                self._path,
+                timeout=30,
+                isolation_level=None,
+            )
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                db.execute(statement)
+            local.db, local.pid = db, os.getpid()
+        return local.db
+
+    def _expires(self, timeout):
+        # Возвращает момент истечения в unix time или None.
+        return self.get_backend_timeout(timeout)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _row(self, key, now):
+        row = self._db.execute(
+            'SELECT value, expires, accessed FROM cache WHERE key = ?',
+            (key,),
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            return None
+        return row
+
+    def _touch_accessed(self, keys, now):
+        self._db.executemany(
+            'UPDATE cache SET accessed = ? WHERE key = ?',
+            ((now, key) for key in keys),
+        )
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        row = self._row(key, now)
+        profiling.cache_lookup(row is not None, row is None)
+        if row is None:
+            return default
+        if now - row[2] > LRU_RESOLUTION:
+            self._touch_accessed([key], now)
+        return pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        mapping = {self._key(key, version): key for key in keys}
+        now = time.time()
+        result, stale = {}, []
+        names = list(mapping)
+        for start in range(0, len(names), BATCH_SIZE):
+            chunk = names[start:start + BATCH_SIZE]
+            rows = self._db.execute(
+                'SELECT key, value, accessed FROM cache'
+                ' WHERE key IN (%s) AND (expires IS NULL OR expires > ?)'
+                % ', '.join('?' * len(chunk)),
+                (*chunk, now),
+            )
+            for name, value, accessed in rows:
+                result[mapping[name]] = pickle.loads(value)
+                if now - accessed > LRU_RESOLUTION:
+                    stale.append(name)
+        if stale:
+            self._touch_accessed(stale, now)
+        profiling.cache_lookup(len(result), len(mapping) - len(result))
+        return result
+
+    def _write(self, rows):
+        self._db.executemany(
+            'INSERT OR REPLACE INTO cache'
+            ' (key, value, expires, accessed, size)'
+            ' VALUES (?, ?, ?, ?, ?)',
+            rows,
+        )
+
+    def _pack(self, key, value, expires, now):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return key, data, expires, now, len(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        self._write([self._pack(
+            self._key(key, version), value, self._expires(timeout), now
+        )])
+        self._maybe_sweep(1)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        expires = self._expires(timeout)
+        rows = [
+            self._pack(self._key(key, version), value, expires, now)
+            for key, value in data.items()
+        ]
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            self._write(rows)
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        self._maybe_sweep(len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            if self._row(key, now) is not None:
+                db.execute('COMMIT')
+                return False
+            self._write([self._pack(key, value, self._expires(timeout), now)])
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        self._maybe_sweep(1)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = self._row(key, time.time())
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            db.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key),
+            )
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ?'
+            ' AND (expires IS NULL OR expires > ?)',
+            (self._expires(timeout), self._key(key, version), time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        return self._row(self._key(key, version), time.time()) is not None
+
+    def delete(self, key, version=None):
+        self._db.execute(
+            'DELETE FROM cache WHERE key = ?', (self._key(key, version),)
+        )
+
+    def delete_many(self, keys, version=None):
+        names = [self._key(key, version) for key in keys]
+        for start in range(0, len(names), BATCH_SIZE):
+            chunk = names[start:start + BATCH_SIZE]
+            self._db.execute(
+                'DELETE FROM cache WHERE key IN (%s)'
+                % ', '.join('?' * len(chunk)),
+                chunk,
+            )
+
+    def keys_with_prefix(self, prefix, version=None):
+        """Живые ключи, начинающиеся с prefix (без префикса версии)."""
+        start = self.make_key('', version=version)
+        pattern = start + prefix
+        rows = self._db.execute(
+            'SELECT key FROM cache WHERE substr(key, 1, ?) = ?'
+            ' AND (expires IS NULL OR expires > ?)',
+            (len(pattern), pattern, time.time()),
+        )
+        return [key[len(start):] for key, in rows]
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def _maybe_sweep(self, written):
+        self._writes += written
+        if self._writes >= self._sweep_interval:
+            self._writes = 0
+            self.sweep()
+
+    def sweep(self):
+        """Удаляет просроченные записи и вытесняет давно не читанные."""
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.execute(
+                'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+            )
+            count, size = db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache'
+            ).fetchone()
+            if count > self._max_entries:
+                self._evict(max(count // self._cull_frequency, 1))
+            if self._max_size and size > self._max_size:
+                self._evict_bytes(size - self._max_size)
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _evict(self, count):
+        self._db.execute(
+            'DELETE FROM cache WHERE key IN ('
+            ' SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (count,),
+        )
+
+    def _evict_bytes(self, excess):
+        freed = 0
+        victims = []
+        for key, size in self._db.execute(
+            'SELECT key, size FROM cache ORDER BY accessed'
+        ):
+            victims.append(key)
+            freed += size
+            if freed >= excess:
+                break
+        for start in range(0, len(victims), BATCH_SIZE):
+            chunk = victims[start:start + BATCH_SIZE]
+            self._db.execute(
+                'DELETE FROM cache WHERE key IN (%s)'
+                % ', '.join('?' * len(chunk)),
+                chunk,
+            )
+
+    def close(self, **kwargs):
+        # Соединение живёт весь поток: открывать файл на каждый
+        # запрос дороже, чем держать его открытым.
+        pass
@@ -0,0 +1,8 @@
+from django.conf import settings
+
+
+def feed_cache(request):
+    """Добавляет в контекст время жизни кеша лент."""
+    return {
+        'FEED_CACHE_TIMEOUT': settings.FEED_CACHE_TIMEOUT,
+    }
@@ -0,0 +1,66 @@
+"""Кеширование страниц для анонимных пользователей."""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .cache import generation, last_modified
+
+PAGE_KEY = 'page:{}:{}'
+
+
+def anonymous_cache_page(namespaces):
+    """Кеширует страницу целиком для анонимных GET-запросов.
+
+    namespaces(**kwargs) возвращает пространства имён кеша, от которых
+    зависит страница: их поколение входит в ключ, поэтому запись
+    устаревает при изменении моделей. Ответ содержит ETag
+    и Last-Modified, условные запросы получают 304 без рендеринга.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            spaces = namespaces(**kwargs)
+            if spaces is None:
+                return view(request, *args, **kwargs)
+            path = hashlib.md5(
+                request.get_full_path().encode()
+            ).hexdigest()
+            key = PAGE_KEY.format(path, generation(*spaces))
+            entry = cache.get(key)
+            if entry is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                entry = {
+                    'content': response.content,
+                    'content_type': response['Content-Type'],
+                    'etag': quote_etag(
+                        hashlib.md5(response.content).hexdigest()
+                    ),
+                    'last_modified': int(last_modified(*spaces)),
+                }
+                cache.set(key, entry, settings.PAGE_CACHE_TIMEOUT)
+            response = get_conditional_response(
+                request,
+                etag=entry['etag'],
+                last_modified=entry['last_modified'],
+            )
+            if response is None:
+                response = HttpResponse(
+                    entry['content'],
+                    content_type=entry['content_type'],
+                )
+            response['ETag'] = entry['etag']
+            response['Last-Modified'] = http_date(entry['last_modified'])
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,52 @@
+"""Сводка журнала запросов всех процессов."""
+from django.core.management.base import BaseCommand
+
+from core import querylog
+
+SORT_KEYS = ('total', 'count', 'avg', 'p95')
+
+
+class Command(BaseCommand):
+    help = 'Показывает самые дорогие отпечатки запросов и их планы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sort',
+            choices=SORT_KEYS,
+            default='total',
+            help='По какому показателю сортировать.',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Сколько отпечатков показать.',
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Очистить журнал после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        rows = sorted(
+            querylog.report(),
+            key=lambda row: row[options['sort']],
+            reverse=True,
+        )[:options['limit']]
+        for row in rows:
+            self.stdout.write(
+                '{id} count={count} total={total:.1f}ms '
+                'avg={avg:.2f}ms p95={p95:.2f}ms'.format(**row)
+            )
+            self.stdout.write(f'    {row["fingerprint"]}')
+            slow = row['slow']
+            if slow:
+                self.stdout.write(
+                    f'    медленный: {slow["duration"]:.1f}ms, '
+                    f'параметры: {slow["params"]}'
+                )
+                for line in slow['plan'].splitlines():
+                    self.stdout.write(f'      {line}')
+        if options['reset']:
+            querylog.reset()
@@ -0,0 +1,285 @@
+"""Профилирование, сжатие ответов и раздача собранной статики."""
+import mimetypes
+import os
+import random
+import re
+import time
+import zlib
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from . import profiling
+from .storage import brotli, compressors
+
+# Имя с хешем содержимого от ManifestStaticFilesStorage: name.0123abcd.css.
+HASHED_RE = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript',
+    'application/xml', 'image/svg+xml',
+)
+
+
+class ProfilingMiddleware:
+    """Замеряет SQL, кеш, шаблоны, миниатюры и весь запрос.
+
+    Включается для запроса с подписанным заголовком PROFILING_HEADER
+    (значение даёт core.profiling.make_token()) или для доли
+    PROFILING_SAMPLE_RATE случайных запросов. Метрики уходят
+    в Server-Timing и в кольцевой буфер процесса.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = 'HTTP_' + getattr(
+            settings, 'PROFILING_HEADER', 'X-Profile'
+        ).upper().replace('-', '_')
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        profiling.instrument_templates()
+
+    def should_profile(self, request):
+        token = request.META.get(self.header)
+        if token is not None:
+            return profiling.check_token(token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        profile = profiling.Profile()
+        start = time.perf_counter()
+        with profiling.activate(profile), ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(self.execute)
+                )
+            response = self.get_response(request)
+        total = (time.perf_counter() - start) * 1000
+        response['Server-Timing'] = self.server_timing(profile, total)
+        match = request.resolver_match
+        profiling.record({
+            'time': time.time(),
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total': total,
+            'db': profile.durations['db'],
+            'queries': profile.counts['db'],
+            'template': profile.durations['template'],
+            'thumbnail': profile.durations['thumbnail'],
+            'cache_hits': profile.counts['cache_hits'],
+            'cache_misses': profile.counts['cache_misses'],
+        })
+        return response
+
+    @staticmethod
+    def execute(execute, sql, params, many, context):
+        with profiling.timer('db'):
+            return execute(sql, params, many, context)
+
+    @staticmethod
+    def server_timing(profile, total):
+        durations, counts = profile.durations, profile.counts
+        return ', '.join((
+            'db;dur=%.1f;desc="%d queries"' % (durations['db'], counts['db']),
+            'cache;desc="%d hits, %d misses"' % (
+                counts['cache_hits'], counts['cache_misses']
+            ),
+            'template;dur=%.1f' % durations['template'],
+            'thumbnail;dur=%.1f;desc="%d"' % (
+                durations['thumbnail'], counts['thumbnail']
+            ),
+            'total;dur=%.1f' % total,
+        ))
+
+
+def accepts(header, encoding) -> bool:
+    """Разрешает ли Accept-Encoding кодировку (q=0 — запрет)."""
+    for item in header.split(','):
+        name, *params = item.strip().split(';')
+        if name.strip().lower() != encoding:
+            continue
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+class StaticFilesMiddleware:
+    """Отдаёт файлы из STATIC_ROOT без похода во view.
+
+    Выбирает .br или .gz копию по Accept-Encoding. Файлы с хешем
+    в имени кешируются навсегда, остальные — на STATIC_MAX_AGE секунд.
+    В режиме DEBUG статику раздаёт runserver.
+    """
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not getattr(settings, 'STATIC_ROOT', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = settings.STATIC_ROOT
+        self.max_age = getattr(settings, 'STATIC_MAX_AGE', 60)
+        self.encodings = [
+            (suffix, 'br' if suffix == '.br' else 'gzip')
+            for suffix, _ in compressors()
+        ]
+        # Собранная статика не меняется до перезапуска: найденные
+        # файлы и их сжатые копии запоминаются.
+        self.files = {}
+
+    def __call__(self, request):
+        if (request.method not in ('GET', 'HEAD')
+                or not request.path.startswith(self.prefix)):
+            return self.get_response(request)
+        name = request.path[len(self.prefix):]
+        variants = self.find(name)
+        if variants is None:
+            return self.get_response(request)
+        return self.serve(request, name, variants)
+
+    def find(self, name):
+        if name not in self.files:
+            try:
+                path = safe_join(self.root, name)
+            except ValueError:
+                return None
+            if not os.path.isfile(path):
+                return None
+            self.files[name] = [(None, path)] + [
+                (encoding, path + suffix)
+                for suffix, encoding in self.encodings
+                if os.path.isfile(path + suffix)
+            ]
+        return self.files[name]
+
+    def serve(self, request, name, variants):
+        accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        encoding, path = variants[0]
+        for candidate in variants[1:]:
+            if accepts(accepted, candidate[0]):
+                encoding, path = candidate
+                break
+        stat = os.stat(variants[0][1])
+        if not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            stat.st_mtime, stat.st_size,
+        ):
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(name)
+            response = FileResponse(
+                open(path, 'rb'),
+                content_type=content_type or 'application/octet-stream',
+            )
+            response['Content-Length'] = os.path.getsize(path)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if len(variants) > 1:
+            response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = (
+            IMMUTABLE if HASHED_RE.search(name)
+            else f'public, max-age={self.max_age}'
+        )
+        return response
+
+
+class CompressionMiddleware:
+    """Сжимает текстовые ответы в brotli или gzip по Accept-Encoding.
+
+    Ответы меньше COMPRESSION_MIN_SIZE байт не сжимаются, потоковые
+    сжимаются по частям без буферизации. Сильный ETag становится
+    слабым: содержимое другое, но условный GET по нему корректен.
+    Уровни сжатия подобраны для динамических страниц: почти тот же
+    размер, что на максимуме, при малой доле CPU.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 500)
+        self.gzip_level = getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6)
+        self.brotli_quality = getattr(
+            settings, 'COMPRESSION_BROTLI_QUALITY', 5
+        )
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is not None and accepts(accepted, 'br'):
+            encoding = 'br'
+        elif accepts(accepted, 'gzip'):
+            encoding = 'gzip'
+        else:
+            return response
+        if response.streaming:
+            response.streaming_content = self.compress_stream(
+                response.streaming_content, encoding
+            )
+            del response['Content-Length']
+        else:
+            content = self.compress(response.content, encoding)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def compressible(self, response):
+        if (response.has_header('Content-Encoding')
+                or response.status_code < 200
+                or response.status_code in (204, 304)):
+            return False
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        if response.streaming:
+            length = response.get('Content-Length')
+            return length is None or int(length) >= self.min_size
+        return len(response.content) >= self.min_size
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def compress_stream(self, chunks, encoding):
+        # После каждой части сжатые данные сбрасываются клиенту,
+        # иначе потоковый ответ копился бы в буфере компрессора.
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            for chunk in chunks:
+                data = compressor.process(chunk) + compressor.flush()
+                if data:
+                    yield data
+            yield compressor.finish()
+            return
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(
+                zlib.Z_SYNC_FLUSH
+            )
+            if data:
+                yield data
+        yield compressor.flush()
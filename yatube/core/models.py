@@ -0,0 +1,42 @@
+from django.db import models
+
+
+class CheckpointQuerySet(models.QuerySet):
+    """Контрольные точки долгих команд."""
+
+    def position(self, name, default=0):
+        value = self.filter(name=name).values_list(
+            'position', flat=True
+        ).first()
+        return default if value is None else value
+
+    def advance(self, name, position):
+        """Запоминает позицию; вызывайте в транзакции обработанной
+        пачки, чтобы пачка и контрольная точка сохранялись вместе."""
+        self.update_or_create(name=name, defaults={'position': position})
+
+    def forget(self, name):
+        self.filter(name=name).delete()
+
+
+class Checkpoint(models.Model):
+    """Позиция, с которой продолжит прерванная команда."""
+    name = models.CharField(
+        verbose_name='Команда',
+        max_length=100,
+        primary_key=True,
+    )
+    position = models.BigIntegerField(
+        verbose_name='Позиция',
+        default=0,
+    )
+
+    objects = CheckpointQuerySet.as_manager()
+
+    def __str__(self) -> str:
+        return f'{self.name}: {self.position}'
+
+    class Meta:
+        """Класс Meta для Checkpoint описание метаданных."""
+        verbose_name = 'checkpoint'
+        verbose_name_plural = 'checkpoints'
@@ -0,0 +1,143 @@
+"""Профилирование запросов: сбор метрик и кольцевой буфер.
+
+Метрики пишутся в профиль текущего потока, который создаёт
+ProfilingMiddleware. Когда профиля нет, запись сводится к проверке
+атрибута thread-local, поэтому хуки в кеше и бэкенде миниатюр
+ничего не стоят для непрофилируемых запросов.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core import signing
+from django.template.base import Template
+
+TOKEN_SALT = 'core.profiling'
+
+_local = threading.local()
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+class Profile:
+    """Длительности (мс) и счётчики одного запроса."""
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.template_depth = 0
+
+    def add(self, name, duration=0.0, count=1):
+        self.durations[name] += duration
+        self.counts[name] += count
+
+
+def current():
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def activate(profile):
+    _local.profile = profile
+    try:
+        yield profile
+    finally:
+        _local.profile = None
+
+
+@contextmanager
+def timer(name):
+    """Замеряет блок, если запрос профилируется."""
+    profile = current()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, (time.perf_counter() - start) * 1000)
+
+
+def cache_lookup(hits, misses):
+    profile = current()
+    if profile is not None:
+        profile.add('cache_hits', count=hits)
+        profile.add('cache_misses', count=misses)
+
+
+def make_token():
+    """Значение заголовка PROFILING_HEADER для профилирования запроса."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def check_token(token) -> bool:
+    max_age = getattr(settings, 'PROFILING_TOKEN_MAX_AGE', 60 * 60 * 24)
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def _instrumented_render(render):
+    def wrapper(self, context):
+        profile = current()
+        # Вложенные шаблоны (include, extends) входят во внешний.
+        if profile is None or profile.template_depth:
+            return render(self, context)
+        profile.template_depth += 1
+        try:
+            with timer('template'):
+                return render(self, context)
+        finally:
+            profile.template_depth -= 1
+    wrapper.instrumented = True
+    return wrapper
+
+
+def instrument_templates():
+    if not getattr(Template.render, 'instrumented', False):
+        Template.render = _instrumented_render(Template.render)
+
+
+def _get_buffer():
+    global _buffer
+    if _buffer is None:
+        _buffer = deque(
+            maxlen=getattr(settings, 'PROFILING_BUFFER_SIZE', 1000)
+        )
+    return _buffer
+
+
+def record(entry):
+    with _buffer_lock:
+        _get_buffer().append(entry)
+
+
+def recent():
+    with _buffer_lock:
+        return list(_get_buffer())
+
+
+def summary():
+    """Сводка буфера по view: число запросов, среднее и максимум."""
+    views = defaultdict(list)
+    for entry in recent():
+        views[entry['view']].append(entry)
+    rows = []
+    for view, entries in views.items():
+        totals = [entry['total'] for entry in entries]
+        rows.append({
+            'view': view,
+            'requests': len(entries),
+            'total_avg': sum(totals) / len(entries),
+            'total_max': max(totals),
+            'db_avg': sum(entry['db'] for entry in entries) / len(entries),
+            'queries_avg': (
+                sum(entry['queries'] for entry in entries) / len(entries)
+            ),
+        })
+    return sorted(rows, key=lambda row: row['total_avg'], reverse=True)
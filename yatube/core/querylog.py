@@ -0,0 +1,193 @@
+"""Журнал запросов к базе с группировкой по отпечаткам.
+
+Обёртка execute нормализует SQL в отпечаток (литералы и списки IN
+заменяются на ?), копит число, суммарное время и выборку длительностей
+для p95, а для медленных запросов сохраняет EXPLAIN QUERY PLAN.
+Каждый процесс периодически сбрасывает снимок в общий кеш, команда
+querylog сводит снимки всех процессов.
+"""
+import hashlib
+import os
+import re
+import socket
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+
+SNAPSHOT_PREFIX = 'querylog:'
+# Сколько последних длительностей хранится для p95.
+SAMPLES = 200
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+PARAM_RE = re.compile(r'%s|\?')
+IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+SPACE_RE = re.compile(r'\s+')
+
+_stats = {}
+_lock = threading.Lock()
+_local = threading.local()
+_last_flush = time.monotonic()
+
+
+def fingerprint(sql) -> str:
+    """SQL без литералов: одинаков для запросов, различающихся
+    только значениями."""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = PARAM_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class Stat:
+    """Счётчики одного отпечатка."""
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=SAMPLES)
+        self.slow = None
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        self.samples.append(duration)
+
+    def as_dict(self):
+        return {
+            'fingerprint': self.fingerprint,
+            'count': self.count,
+            'total': self.total,
+            'samples': list(self.samples),
+            'slow': self.slow,
+        }
+
+
+def _explain(connection, sql, params):
+    # Отдельный курсор: результат исходного запроса ещё не прочитан.
+    prefix = (
+        'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite'
+        else 'EXPLAIN '
+    )
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return '\n'.join(
+                ' | '.join(str(column) for column in row)
+                for row in cursor.fetchall()
+            )
+    except Exception as error:
+        return f'EXPLAIN не удался: {error}'
+    finally:
+        _local.explaining = False
+
+
+def wrapper(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrapper."""
+    if getattr(_local, 'explaining', False):
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - start) * 1000
+        key = fingerprint(sql)
+        with _lock:
+            stat = _stats.get(key)
+            if stat is None:
+                stat = _stats[key] = Stat(key)
+            stat.add(duration)
+        slow = _setting('QUERY_LOG_SLOW_MS', 100)
+        if (duration >= slow and not many
+                and sql.lstrip()[:6].upper() == 'SELECT'):
+            stat.slow = {
+                'duration': duration,
+                'sql': sql,
+                'params': [str(param) for param in params or ()],
+                'plan': _explain(context['connection'], sql, params),
+            }
+        _maybe_flush()
+
+
+def install(sender, connection, **kwargs):
+    """Обработчик connection_created: включает журнал для соединения."""
+    if (_setting('QUERY_LOG_ENABLED', False)
+            and wrapper not in connection.execute_wrappers):
+        connection.execute_wrappers.append(wrapper)
+
+
+def snapshot_key() -> str:
+    return f'{SNAPSHOT_PREFIX}{socket.gethostname()}:{os.getpid()}'
+
+
+def _maybe_flush():
+    interval = _setting('QUERY_LOG_FLUSH_INTERVAL', 10)
+    if time.monotonic() - _last_flush >= interval:
+        flush()
+
+
+def flush():
+    """Сбрасывает снимок процесса в общий кеш."""
+    global _last_flush
+    _last_flush = time.monotonic()
+    with _lock:
+        stats = [stat.as_dict() for stat in _stats.values()]
+    cache.set(snapshot_key(), stats, None)
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+    keys = getattr(cache, 'keys_with_prefix', lambda prefix: [])
+    cache.delete_many(keys(SNAPSHOT_PREFIX))
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def report():
+    """Сводит снимки всех процессов: список отпечатков с count,
+    total, avg, p95 (мс) и самым медленным запросом с планом."""
+    keys = getattr(cache, 'keys_with_prefix', None)
+    snapshots = (
+        cache.get_many(keys(SNAPSHOT_PREFIX)).values() if keys
+        else [cache.get(snapshot_key(), [])]
+    )
+    merged = {}
+    for stats in snapshots:
+        for stat in stats:
+            row = merged.setdefault(stat['fingerprint'], {
+                'fingerprint': stat['fingerprint'],
+                'id': hashlib.md5(
+                    stat['fingerprint'].encode()
+                ).hexdigest()[:8],
+                'count': 0,
+                'total': 0.0,
+                'samples': [],
+                'slow': None,
+            })
+            row['count'] += stat['count']
+            row['total'] += stat['total']
+            row['samples'] += stat['samples']
+            slow = stat['slow']
+            if slow and (row['slow'] is None
+                         or slow['duration'] > row['slow']['duration']):
+                row['slow'] = slow
+    for row in merged.values():
+        row['avg'] = row['total'] / row['count']
+        row['p95'] = percentile(row.pop('samples'), 0.95)
+    return list(merged.values())
@@ -0,0 +1,22 @@
+"""Запуск тестов через manage.py test."""
+import shutil
+import tempfile
+
+from django.test.runner import DiscoverRunner
+
+from .testing import isolated_settings
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner с отдельными кешами на каждый запуск."""
+
+    def setup_test_environment(self, **kwargs):
+        self._directory = tempfile.mkdtemp(prefix='yatube-tests-')
+        self._settings = isolated_settings(self._directory)
+        self._settings.enable()
+        super().setup_test_environment(**kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        super().teardown_test_environment(**kwargs)
+        self._settings.disable()
+        shutil.rmtree(self._directory, ignore_errors=True)
@@ -0,0 +1,68 @@
+"""Статика с хешем содержимого в имени и сжатыми копиями.
+
+collectstatic пишет рядом с каждым хешированным файлом .gz и, если
+установлен пакет brotli, .br; StaticFilesMiddleware отдаёт подходящую
+копию по Accept-Encoding.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.svg', '.ico', '.json', '.txt', '.html', '.xml',
+)
+# Маленькие файлы сжимать бессмысленно: выигрыш меньше заголовков.
+MIN_SIZE = 256
+
+
+def compressors():
+    """Пары (расширение, функция сжатия), лучшие первыми."""
+    result = []
+    if brotli is not None:
+        result.append(('.br', brotli.compress))
+    result.append(('.gz', lambda data: gzip.compress(data, 9, mtime=0)))
+    return result
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage, сохраняющее сжатые копии файлов."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(hashed):
+            for compressed in self.compress(name):
+                yield name, compressed, True
+
+    def compress(self, name):
+        """Пишет сжатые копии name, если они заметно меньше."""
+        if not name.endswith(COMPRESSIBLE):
+            return []
+        with self.open(name) as original:
+            data = original.read()
+        if len(data) < MIN_SIZE:
+            return []
+        written = []
+        for suffix, compress in compressors():
+            content = compress(data)
+            if len(content) >= len(data) * 0.95:
+                continue
+            target = name + suffix
+            if self.exists(target):
+                self.delete(target)
+            self._save(target, ContentFile(content))
+            written.append(target)
+        return written
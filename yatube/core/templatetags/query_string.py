@@ -0,0 +1,19 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def query_string(context, **params):
+    """Параметры текущего запроса с заменой переданных.
+
+    Параметр со значением None удаляется, номер страницы
+    сбрасывается при переходе по курсору.
+    """
+    query = context['request'].GET.copy()
+    query.pop('page', None)
+    for key, value in params.items():
+        query.pop(key, None)
+        if value is not None:
+            query[key] = value
+    return query.urlencode()
@@ -1,6 +1,20 @@
+import gzip
+import os
+import shutil
+import tempfile
+import time
 from http import HTTPStatus
+from io import StringIO
 
-from django.test import Client, TestCase
+from core import profiling, querylog
+from core.cache_backend import SQLiteCache
+from core.middleware import CompressionMiddleware
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
 
 
 class UsersViewsTests(TestCase):
@@ -12,3 +26,215 @@ class UsersViewsTests(TestCase):
         response = self.guest_client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class SQLiteCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = f'{self.directory}/cache.sqlite3'
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_shared_between_instances(self):
+        """Записи видны другому экземпляру с тем же файлом."""
+        self.cache.set('key', {'value': 1})
+        other = SQLiteCache(self.location, {})
+        self.assertEqual(other.get('key'), {'value': 1})
+        other.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_incr_and_add(self):
+        """incr атомарно меняет число, add не перезаписывает ключ."""
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 10))
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.assertEqual(self.cache.decr('counter', 2), 0)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_many(self):
+        """get_many и set_many работают пачкой."""
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']),
+            {'a': 1, 'b': 2},
+        )
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_keys_with_prefix(self):
+        """Поиск ключей по префиксу для хранилища миниатюр."""
+        self.cache.set_many({'thumb||a': 1, 'thumb||b': 2, 'other': 3})
+        self.assertEqual(
+            sorted(self.cache.keys_with_prefix('thumb||')),
+            ['thumb||a', 'thumb||b'],
+        )
+
+    def test_expiration(self):
+        """Просроченная запись не возвращается."""
+        self.cache.set('key', 'value', 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+
+    def test_eviction(self):
+        """При переполнении вытесняются записи."""
+        cache = SQLiteCache(self.location, {
+            'OPTIONS': {'MAX_ENTRIES': 10, 'SWEEP_INTERVAL': 1},
+        })
+        for number in range(20):
+            cache.set(f'key{number}', number)
+        self.assertLessEqual(
+            len(cache.get_many([f'key{number}' for number in range(20)])),
+            10,
+        )
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def test_signed_header(self):
+        """Запрос с подписанным заголовком профилируется."""
+        cache.clear()
+        response = self.client.get('/', HTTP_X_PROFILE=profiling.make_token())
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+        entry = profiling.recent()[-1]
+        self.assertEqual(entry['view'], 'posts:index')
+        self.assertGreater(entry['queries'], 0)
+        self.assertGreater(entry['cache_misses'], 0)
+        self.assertIn(
+            'posts:index', [row['view'] for row in profiling.summary()]
+        )
+
+    def test_not_profiled(self):
+        """Без заголовка или с чужой подписью профиля нет."""
+        self.assertFalse(self.client.get('/').has_header('Server-Timing'))
+        response = self.client.get('/', HTTP_X_PROFILE='profile:forged')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampling(self):
+        """Доля случайных запросов профилируется без заголовка."""
+        self.assertTrue(
+            Client().get('/').has_header('Server-Timing')
+        )
+
+
+class QueryLogTests(TestCase):
+    def setUp(self):
+        querylog.reset()
+
+    def tearDown(self):
+        querylog.reset()
+
+    def test_fingerprint(self):
+        """Запросы, различающиеся значениями, дают один отпечаток."""
+        self.assertEqual(
+            querylog.fingerprint(
+                "SELECT * FROM t WHERE a = 'x' AND id IN (%s, %s)"
+            ),
+            querylog.fingerprint(
+                'SELECT * FROM t  WHERE a = %s AND id IN (1, 2, 3)'
+            ),
+        )
+
+    @override_settings(QUERY_LOG_SLOW_MS=0)
+    def test_report_with_plan(self):
+        """Сводка копит запросы и план медленного запроса."""
+        users = get_user_model().objects
+        with connection.execute_wrapper(querylog.wrapper):
+            for number in range(3):
+                list(users.filter(username=f'user{number}'))
+        querylog.flush()
+        row = next(
+            row for row in querylog.report()
+            if 'auth_user' in row['fingerprint']
+        )
+        self.assertEqual(row['count'], 3)
+        self.assertIn('auth_user', row['slow']['plan'])
+        out = StringIO()
+        call_command('querylog', sort='count', stdout=out)
+        self.assertIn(row['id'], out.getvalue())
+
+
+class StaticFilesTests(TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.source, 'css'))
+        with open(os.path.join(self.source, 'css', 'site.css'), 'w') as f:
+            f.write('body { margin: 0; }\n' * 100)
+
+    def tearDown(self):
+        shutil.rmtree(self.source, ignore_errors=True)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_compressed_hashed_files(self):
+        """collectstatic пишет сжатые копии, они отдаются навсегда."""
+        with override_settings(
+            STATICFILES_DIRS=[self.source],
+            STATIC_ROOT=self.root,
+            STATICFILES_STORAGE=(
+                'core.storage.CompressedManifestStaticFilesStorage'
+            ),
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            names = os.listdir(os.path.join(self.root, 'css'))
+            hashed = next(
+                name for name in names
+                if name != 'site.css' and name.endswith('.css')
+            )
+            self.assertIn(hashed + '.gz', names)
+            response = Client().get(
+                f'/static/css/{hashed}', HTTP_ACCEPT_ENCODING='gzip, br;q=0'
+            )
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response['Content-Type'], 'text/css')
+            self.assertIn('immutable', response['Cache-Control'])
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            body = gzip.decompress(b''.join(response.streaming_content))
+            self.assertTrue(body.startswith(b'body { margin: 0; }'))
+            plain = Client().get('/static/css/site.css')
+            self.assertFalse(plain.has_header('Content-Encoding'))
+            self.assertNotIn('immutable', plain['Cache-Control'])
+
+
+class CompressionMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_page_compressed_with_conditional_get(self):
+        """Страница сжимается, ETag слабый и даёт 304."""
+        response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn(b'</html>', gzip.decompress(response.content))
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        response = self.client.get(
+            '/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_small_and_unaccepted_not_compressed(self):
+        """Короткие ответы и клиенты без gzip получают исходный ответ."""
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        middleware = CompressionMiddleware(lambda request: HttpResponse('ok'))
+        self.assertFalse(middleware(request).has_header('Content-Encoding'))
+        response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming(self):
+        """Потоковый ответ сжимается по частям."""
+        chunks = [b'<p>%d</p>' % number * 50 for number in range(20)]
+        middleware = CompressionMiddleware(
+            lambda request: StreamingHttpResponse(iter(chunks))
+        )
+        response = middleware(
+            RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        parts = list(response.streaming_content)
+        self.assertGreater(len(parts), 1)
+        self.assertEqual(gzip.decompress(b''.join(parts)), b''.join(chunks))
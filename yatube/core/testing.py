@@ -0,0 +1,63 @@
+"""Помощники для тестов."""
+import copy
+import os
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext, override_settings
+
+
+def isolated_settings(directory):
+    """Настройки, отделяющие тесты от общего окружения.
+
+    Файлы кешей живут в directory, чтобы cache.clear() в тестах
+    не стирал рабочий кеш, а бессрочные ключи не переживали запуск.
+    Миниатюры и раскладка лент идут без пула: временный MEDIA_ROOT
+    тестов удаляется сразу после запроса.
+    """
+    caches = copy.deepcopy(settings.CACHES)
+    for alias, options in caches.items():
+        options['LOCATION'] = os.path.join(directory, f'{alias}.sqlite3')
+    return override_settings(
+        CACHES=caches, THUMBNAIL_WORKERS=0, TIMELINE_WORKERS=0,
+    )
+
+
+class _AssertMaxQueriesContext(CaptureQueriesContext):
+    def __init__(self, test_case, budget, connection):
+        self.test_case = test_case
+        self.budget = budget
+        super().__init__(connection)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return
+        executed = len(self)
+        self.test_case.assertLessEqual(
+            executed, self.budget,
+            '%d queries executed, budget is %d\nCaptured queries were:\n%s'
+            % (
+                executed, self.budget,
+                '\n'.join(
+                    '%d. %s' % (number, query['sql'])
+                    for number, query in enumerate(self.captured_queries, 1)
+                ),
+            ),
+        )
+
+
+class QueryBudgetMixin:
+    """Добавляет TestCase проверку бюджета запросов.
+
+    В отличие от assertNumQueries падает, только если запросов
+    больше бюджета, и печатает все выполненные запросы.
+    """
+
+    def assertMaxQueries(self, budget, func=None, *args,
+                         using=DEFAULT_DB_ALIAS, **kwargs):
+        context = _AssertMaxQueriesContext(self, budget, connections[using])
+        if func is None:
+            return context
+        with context:
+            func(*args, **kwargs)
@@ -0,0 +1,92 @@
+"""Хранилище ключей sorl-thumbnail в общем кеше и пакетный поиск
+готовых миниатюр.
+
+Стандартное хранилище держит записи в таблице thumbnail_kvstore,
+а каждый тег {% thumbnail %} ищет свою миниатюру отдельным запросом.
+Здесь записи живут только в кеше, а миниатюры целой страницы
+находятся одним get_many.
+"""
+from django.core.cache import InvalidCacheBackendError, cache, caches
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend as BaseThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import KVStoreBase, add_prefix
+
+from . import profiling
+
+
+class CacheKVStore(KVStoreBase):
+    """Хранилище ключей sorl без таблицы в базе."""
+
+    @property
+    def cache(self):
+        try:
+            return caches[settings.THUMBNAIL_CACHE]
+        except InvalidCacheBackendError:
+            return cache
+
+    def get_many(self, keys):
+        """Возвращает {ключ: ImageFile} для найденных в хранилище ключей."""
+        keys = {add_prefix(key): key for key in keys}
+        found = self.cache.get_many(keys)
+        return {
+            keys[raw_key]: deserialize_image_file(value)
+            for raw_key, value in found.items() if value
+        }
+
+    def _get_raw(self, key):
+        return self.cache.get(key)
+
+    def _set_raw(self, key, value):
+        self.cache.set(key, value, settings.THUMBNAIL_CACHE_TIMEOUT)
+
+    def _delete_raw(self, *keys):
+        self.cache.delete_many(keys)
+
+    def _find_keys_raw(self, prefix):
+        # Перебор ключей не входит в API кеша Django: без него
+        # cleanup и clear ничего не находят.
+        keys_with_prefix = getattr(self.cache, 'keys_with_prefix', None)
+        if keys_with_prefix is None:
+            return []
+        return keys_with_prefix(prefix)
+
+
+class ThumbnailBackend(BaseThumbnailBackend):
+    """Бэкенд sorl с пакетным поиском готовых миниатюр."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with profiling.timer('thumbnail'):
+            return super().get_thumbnail(file_, geometry_string, **options)
+
+    def _options(self, source, options):
+        # Те же умолчания, что в get_thumbnail: от них зависит имя
+        # миниатюры, а значит и ключ в хранилище.
+        options = dict(options)
+        if settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def get_cached_thumbnails(self, jobs):
+        """Ищет готовые миниатюры одним запросом к хранилищу.
+
+        jobs — пары (файл, геометрия, параметры). Возвращает список
+        ImageFile в том же порядке, None — миниатюры ещё нет.
+        """
+        keys = []
+        for file_, geometry_string, options in jobs:
+            source = ImageFile(file_)
+            name = self._get_thumbnail_filename(
+                source, geometry_string, self._options(source, options)
+            )
+            keys.append(ImageFile(name, default.storage).key)
+        found = default.kvstore.get_many(keys)
+        return [found.get(key) for key in keys]
@@ -1,26 +1,56 @@
 """Подключение модулей."""
 from django.contrib import admin
+from django.db import transaction
 
+from . import search
 from .models import Comment, Follow, Group, Post
 
 
+class SearchIndexAdminMixin:
+    """Поиск в списке объектов через полнотекстовый индекс."""
+    search_index = search.POST_INDEX
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search.search(queryset, search_term, self.search_index), False
+
+
+class AtomicAdminMixin:
+    """Сохраняет и удаляет объекты вместе со счётчиками в транзакции."""
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            super().delete_queryset(request, queryset)
+
+
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk',
                     'title',
                     'slug',
-                    'description'
+                    'description',
+                    'posts_count',
                     )
     list_editable = ('title',)
     empty_value_display = '-пусто)))-'
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(SearchIndexAdminMixin, AtomicAdminMixin, admin.ModelAdmin):
     """Класс кастомной админки."""
     list_display = ('pk',
                     'text',
                     'pub_date',
                     'author',
                     'group',
+                    'comments_count',
                     )
     list_editable = ('group',)
     search_fields = ('text',)
@@ -28,7 +58,9 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(SearchIndexAdminMixin, AtomicAdminMixin,
+                   admin.ModelAdmin):
+    search_index = search.COMMENT_INDEX
     list_display = ('post',
                     'author',
                     'text',
@@ -38,7 +70,7 @@ class CommentAdmin(admin.ModelAdmin):
     list_filter = ('created',)
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(AtomicAdminMixin, admin.ModelAdmin):
     list_display = ('user',
                     'author'
                     )
@@ -5,3 +5,6 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     """Класc настроек приложения Posts."""
     name = 'posts'
+
+    def ready(self):
+        from . import signals  # noqa: F401
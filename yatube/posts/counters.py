@@ -0,0 +1,107 @@
+"""Денормализованные счётчики постов, комментариев и подписок."""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, Profile
+
+
+def _increment(queryset, field):
+    queryset.update(**{field: F(field) + 1})
+
+
+def _decrement(queryset, field):
+    queryset.filter(**{f'{field}__gt': 0}).update(**{field: F(field) - 1})
+
+
+def post_added(author_id, group_id):
+    _increment(Profile.objects.filter(user_id=author_id), 'posts_count')
+    if group_id is not None:
+        _increment(Group.objects.filter(pk=group_id), 'posts_count')
+
+
+def post_removed(author_id, group_id):
+    _decrement(Profile.objects.filter(user_id=author_id), 'posts_count')
+    if group_id is not None:
+        _decrement(Group.objects.filter(pk=group_id), 'posts_count')
+
+
+def post_moved(old_group_id, new_group_id):
+    if old_group_id == new_group_id:
+        return
+    if old_group_id is not None:
+        _decrement(Group.objects.filter(pk=old_group_id), 'posts_count')
+    if new_group_id is not None:
+        _increment(Group.objects.filter(pk=new_group_id), 'posts_count')
+
+
+def comment_added(post_id):
+    _increment(Post.objects.filter(pk=post_id), 'comments_count')
+
+
+def comment_removed(post_id):
+    _decrement(Post.objects.filter(pk=post_id), 'comments_count')
+
+
+def follow_added(user_id, author_id):
+    _increment(Profile.objects.filter(user_id=author_id), 'followers_count')
+    _increment(Profile.objects.filter(user_id=user_id), 'following_count')
+
+
+def follow_removed(user_id, author_id):
+    _decrement(Profile.objects.filter(user_id=author_id), 'followers_count')
+    _decrement(Profile.objects.filter(user_id=user_id), 'following_count')
+
+
+def _add(queryset, field, deltas, key='pk'):
+    """Прибавляет к field строк из deltas {id: n}; один UPDATE на каждое n."""
+    by_delta = {}
+    for pk, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(pk)
+    for delta, ids in by_delta.items():
+        queryset.filter(**{f'{key}__in': ids}).update(
+            **{field: F(field) + delta}
+        )
+
+
+def posts_imported(author_counts, group_counts):
+    """Учитывает пачку постов: {id автора: n}, {id группы: n}."""
+    _add(Profile.objects.all(), 'posts_count', author_counts, 'user_id')
+    _add(Group.objects.all(), 'posts_count', group_counts)
+
+
+def comments_imported(post_counts):
+    """Учитывает пачку комментариев: {id поста: n}."""
+    _add(Post.objects.all(), 'comments_count', post_counts)
+
+
+def _total(queryset, field):
+    """Подзапрос с количеством строк queryset для OuterRef('pk')."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total')
+        ),
+        0,
+    )
+
+
+def recount_profiles(queryset):
+    """Пересчитывает счётчики пользователей из queryset профилей."""
+    return queryset.update(
+        posts_count=_total(Post.objects.all(), 'author'),
+        followers_count=_total(Follow.objects.all(), 'author'),
+        following_count=_total(Follow.objects.all(), 'user'),
+    )
+
+
+def recount_groups(queryset):
+    """Пересчитывает количество постов в группах из queryset."""
+    return queryset.update(posts_count=_total(Post.objects.all(), 'group'))
+
+
+def recount_posts(queryset):
+    """Пересчитывает количество комментариев у постов из queryset."""
+    return queryset.update(
+        comments_count=_total(Comment.objects.all(), 'post')
+    )
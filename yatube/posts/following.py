@@ -0,0 +1,58 @@
+"""Множество авторов, на которых подписан пользователь, в кеше."""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Follow
+
+FOLLOWING_KEY = 'following:{}'
+
+
+def following_ids(user) -> frozenset:
+    """id авторов из подписок: из кеша, при промахе — один запрос.
+
+    Результат запоминается на объекте пользователя до конца запроса.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    ids = getattr(user, '_following_ids', None)
+    if ids is None:
+        key = FOLLOWING_KEY.format(user.pk)
+        ids = cache.get(key)
+        if ids is None:
+            ids = frozenset(Follow.objects.filter(
+                user_id=user.pk
+            ).values_list('author_id', flat=True))
+            cache.set(key, ids, settings.FEED_CACHE_TIMEOUT)
+        user._following_ids = ids
+    return ids
+
+
+def is_following(user, author_id) -> bool:
+    return author_id in following_ids(user)
+
+
+def annotate(posts, user):
+    """Проставляет post.following для всей страницы одним поиском.
+
+    None — кнопка подписки не нужна: гость или собственный пост.
+    """
+    ids = following_ids(user)
+    for post in posts:
+        post.following = (
+            None if not user.is_authenticated or post.author_id == user.pk
+            else post.author_id in ids
+        )
+
+
+def fingerprint(user) -> str:
+    """Часть ключа фрагментов, зависящих от подписок пользователя."""
+    if not user.is_authenticated:
+        return ''
+    ids = ','.join(map(str, sorted(following_ids(user))))
+    return hashlib.md5(f'{user.pk}:{ids}'.encode()).hexdigest()[:12]
+
+
+def invalidate(user_id):
+    cache.delete(FOLLOWING_KEY.format(user_id))
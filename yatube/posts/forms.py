@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import images
 from .models import Comment, Group, Post
 
 COUNT_CHAR_TEXT = 10
@@ -16,6 +18,12 @@ class PostForm(forms.ModelForm):
             raise forms.ValidationError('Поле должно быть больше 10')
         return data
 
+    def clean_image(self):
+        data = self.cleaned_data['image']
+        if isinstance(data, UploadedFile):
+            return images.normalize(data)
+        return data
+
 
 class GroupForm(forms.ModelForm):
 
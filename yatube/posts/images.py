@@ -0,0 +1,91 @@
+"""Нормализация загружаемых картинок постов.
+
+Оригиналы с камер весят десятки мегабайт, и каждая миниатюра потом
+платит за их декодирование. Перед сохранением картинка проверяется
+по заголовку, поворачивается по EXIF, уменьшается до
+IMAGE_MAX_DIMENSION и пересжимается без метаданных.
+"""
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from PIL import Image, ImageOps
+
+# Форматы, которые пересжимаются; остальные (например, анимированный
+# GIF) только проверяются, чтобы не потерять кадры.
+REENCODE_FORMATS = ('JPEG', 'PNG', 'WEBP')
+# Сведения о картинке, которые переживают пересжатие.
+KEEP_INFO = ('icc_profile', 'transparency')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _save_options(image_format):
+    quality = _setting('IMAGE_QUALITY', 85)
+    if image_format == 'JPEG':
+        return {'quality': quality, 'optimize': True, 'progressive': True}
+    if image_format == 'WEBP':
+        return {'quality': quality, 'method': 6}
+    return {'optimize': True}
+
+
+def check(upload):
+    """Отбраковывает файл по размеру и заголовку, не декодируя пиксели.
+
+    Возвращает открытую лениво картинку.
+    """
+    max_size = _setting('IMAGE_MAX_UPLOAD_SIZE', 20 * 1024 * 1024)
+    if upload.size > max_size:
+        raise ValidationError(
+            'Файл больше %(size)d МБ.',
+            code='file_too_large',
+            params={'size': max_size // (1024 * 1024)},
+        )
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except Image.DecompressionBombError:
+        image = None
+    max_pixels = _setting('IMAGE_MAX_PIXELS', 50_000_000)
+    if image is None or image.width * image.height > max_pixels:
+        raise ValidationError(
+            'Слишком большое разрешение картинки.',
+            code='too_many_pixels',
+        )
+    return image
+
+
+def normalize(upload):
+    """Возвращает файл для сохранения вместо загруженного."""
+    image = check(upload)
+    image_format = image.format
+    if image_format not in REENCODE_FORMATS:
+        upload.seek(0)
+        return upload
+    max_dimension = _setting('IMAGE_MAX_DIMENSION', 2048)
+    # JPEG декодируется сразу в уменьшенном масштабе: в памяти
+    # не оказывается полноразмерный растр.
+    image.draft('RGB', (max_dimension, max_dimension))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    # EXIF и XMP не переносятся, цветовой профиль сохраняется.
+    # Кодировщик PNG берёт EXIF из image.info, если он не передан.
+    image.info = {
+        key: value for key, value in image.info.items() if key in KEEP_INFO
+    }
+    options = _save_options(image_format)
+    options['exif'] = b''
+    icc_profile = image.info.get('icc_profile')
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    output = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    image.save(output, image_format, **options)
+    output.seek(0)
+    return File(output, name=upload.name)
@@ -0,0 +1,77 @@
+"""Пространства имён кеша лент и их инвалидация."""
+from core.cache import bump
+
+from .models import Group, Post, User
+
+INDEX = 'index'
+
+
+def group_namespace(slug) -> str:
+    return f'group:{slug}'
+
+
+def profile_namespace(username) -> str:
+    return f'profile:{username}'
+
+
+def post_namespace(post_id) -> str:
+    return f'post:{post_id}'
+
+
+def post_page_namespaces(post_id):
+    """Страница поста зависит от поста, профиля автора и группы.
+
+    Берётся текущий slug группы: после его смены ключ страницы
+    указывает на новое пространство имён и старая копия не читается.
+    """
+    row = Post.objects.filter(
+        pk=post_id
+    ).values_list('author__username', 'group__slug').first()
+    if row is None:
+        return None
+    username, slug = row
+    namespaces = (post_namespace(post_id), profile_namespace(username))
+    if slug is not None:
+        namespaces += (group_namespace(slug),)
+    return namespaces
+
+
+def invalidate_post(post, group_ids=()):
+    """Сбрасывает кеш ленты, группы и профиля, где показан пост."""
+    group_ids = {post.group_id, *group_ids} - {None}
+    slugs = Group.objects.filter(
+        pk__in=group_ids
+    ).values_list('slug', flat=True)
+    username = User.objects.filter(
+        pk=post.author_id
+    ).values_list('username', flat=True).first()
+    bump(
+        INDEX,
+        post_namespace(post.pk),
+        profile_namespace(username),
+        *(group_namespace(slug) for slug in slugs),
+    )
+
+
+def invalidate_group(group):
+    bump(INDEX, group_namespace(group.slug))
+
+
+def invalidate_follow(follow):
+    """Счётчики подписок показаны в профилях обоих пользователей."""
+    usernames = User.objects.filter(
+        pk__in=(follow.user_id, follow.author_id)
+    ).values_list('username', flat=True)
+    bump(*(profile_namespace(username) for username in usernames))
+
+
+def invalidate_author(user):
+    """Имя автора показано в карточках его постов."""
+    slugs = Group.objects.filter(
+        posts__author=user
+    ).distinct().values_list('slug', flat=True)
+    bump(
+        INDEX,
+        profile_namespace(user.username),
+        *(group_namespace(slug) for slug in slugs),
+    )
@@ -0,0 +1,93 @@
+"""Подготовка миниатюр всех картинок постов в нескольких процессах."""
+import os
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.models import Checkpoint
+from posts import thumbnails
+from posts.models import Post
+
+CHUNK_SIZE = 100
+CHECKPOINT = 'generate_thumbnails'
+
+
+def _generate(name):
+    """Выполняется в дочернем процессе, возвращает текст ошибки."""
+    try:
+        thumbnails.generate(name)
+    except Exception as error:
+        return f'{name}: {error}'
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Готовит миниатюры всех размеров из шаблонов. После прерывания '
+        'продолжает с последней обработанной пачки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Сколько процессов режут картинки.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Сколько постов обработать между контрольными точками.',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать сначала, забыв контрольную точку.',
+        )
+
+    def handle(self, *args, **options):
+        if options['restart']:
+            Checkpoint.objects.forget(CHECKPOINT)
+        checkpoint = Checkpoint.objects.position(CHECKPOINT)
+        posts = Post.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).order_by('pk')
+        total = posts.count()
+        done = posts.filter(pk__lte=checkpoint).count()
+        if done:
+            self.stdout.write(f'Продолжение с поста {checkpoint}')
+        # Соединения не должны наследоваться дочерними процессами.
+        connections.close_all()
+        pool = None
+        if options['processes'] > 1:
+            pool = Pool(options['processes'])
+        try:
+            failed = 0
+            while True:
+                chunk = list(
+                    posts.filter(pk__gt=checkpoint).values_list(
+                        'pk', 'image'
+                    )[:options['chunk_size']]
+                )
+                if not chunk:
+                    break
+                names = [name for _, name in chunk]
+                results = (
+                    pool.map(_generate, names) if pool
+                    else map(_generate, names)
+                )
+                for error in filter(None, results):
+                    failed += 1
+                    self.stderr.write(error)
+                checkpoint = chunk[-1][0]
+                Checkpoint.objects.advance(CHECKPOINT, checkpoint)
+                done += len(chunk)
+                self.stdout.write(f'{done}/{total}')
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        Checkpoint.objects.forget(CHECKPOINT)
+        self.stdout.write(f'Готово, ошибок: {failed}')
@@ -0,0 +1,303 @@
+"""Массовый импорт постов и комментариев из JSONL или CSV."""
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import Counter
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.cache import bump
+from core.models import Checkpoint
+from posts import counters, search, timeline
+from posts.invalidation import (INDEX, group_namespace, post_namespace,
+                                profile_namespace)
+from posts.models import Comment, Group, Post, User
+
+BATCH_SIZE = 1000
+CHECKPOINT = 'import_posts:{}'
+FORMATS = ('jsonl', 'csv')
+
+
+class RecordError(ValueError):
+    """Запись нельзя импортировать; строка пропускается."""
+
+
+def read_jsonl(stream):
+    """Записи построчно; битая строка отдаётся как RecordError."""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            yield None
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as error:
+            yield RecordError(f'некорректный JSON: {error}')
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv}
+
+
+def parse_date(value):
+    if not value:
+        return None
+    date = parse_datetime(value)
+    if date is None:
+        raise RecordError(f'неверная дата {value!r}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date, timezone.utc)
+    return date
+
+
+def assign_ids(model, objs, last):
+    """Проставляет id после bulk_create, если СУБД их не вернула.
+
+    SQLite сериализует запись: пачка, вставленная в транзакции,
+    получает id сразу после last.
+    """
+    if objs[0].pk is not None:
+        return
+    ids = model.objects.filter(pk__gt=last).order_by(
+        'pk'
+    ).values_list('pk', flat=True)
+    for obj, pk in zip(objs, ids):
+        obj.pk = pk
+
+
+def restore_dates(model, objs, field):
+    """auto_now_add перезаписывает дату при вставке — возвращаем её."""
+    dated = [obj for obj in objs if obj.imported_date]
+    for obj in dated:
+        setattr(obj, field, obj.imported_date)
+    model.objects.bulk_update(dated, [field])
+
+
+def bulk_insert(model, objs, date_field):
+    last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+    model.objects.bulk_create(objs)
+    assign_ids(model, objs, last)
+    restore_dates(model, objs, date_field)
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты (author, group, text, pub_date) и комментарии '
+        '(type=comment, post, author, text, created) из JSONL или CSV '
+        'пачками через bulk_create. После прерывания продолжает '
+        'с последней сохранённой пачки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл с записями или «-» для чтения из stdin.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат файла; по умолчанию — по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько записей вставлять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать сначала, забыв контрольную точку.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.')
+        if fmt not in FORMATS:
+            raise CommandError('Укажите --format: jsonl или csv')
+        # Из stdin продолжить нельзя: контрольная точка только для файлов.
+        self.checkpoint = None
+        if path != '-':
+            self.checkpoint = CHECKPOINT.format(
+                hashlib.md5(os.path.abspath(path).encode()).hexdigest()
+            )
+            if options['restart']:
+                Checkpoint.objects.forget(self.checkpoint)
+        line = (
+            Checkpoint.objects.position(self.checkpoint)
+            if self.checkpoint else 0
+        )
+        if line:
+            self.stdout.write(f'Продолжение со строки {line + 1}')
+        self.authors = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.failed = 0
+        stream = (
+            sys.stdin if path == '-'
+            else open(path, encoding='utf-8', newline='')
+        )
+        try:
+            records = islice(READERS[fmt](stream), line, None)
+            self.run(records, line, options['batch_size'])
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        if self.checkpoint:
+            Checkpoint.objects.forget(self.checkpoint)
+        self.stdout.write(f'Готово, ошибок: {self.failed}')
+
+    def run(self, records, line, batch_size):
+        started = time.monotonic()
+        imported = 0
+        while True:
+            chunk = list(islice(records, batch_size))
+            if not chunk:
+                break
+            posts, comments = [], []
+            for record in chunk:
+                line += 1
+                obj = self.build(line, record)
+                if isinstance(obj, Post):
+                    posts.append(obj)
+                elif obj is not None:
+                    comments.append(obj)
+            # Пачка и контрольная точка сохраняются вместе: после
+            # сбоя пачка либо целиком есть, либо будет вставлена снова.
+            with transaction.atomic():
+                namespaces = self.insert_posts(posts)
+                comments = self.existing(comments)
+                namespaces |= self.insert_comments(comments)
+                if self.checkpoint:
+                    Checkpoint.objects.advance(self.checkpoint, line)
+            if namespaces:
+                bump(INDEX, *namespaces)
+            imported += len(posts) + len(comments)
+            rate = imported / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f'{line}: {imported} записей, {rate:.0f}/с')
+
+    def error(self, line, message):
+        self.failed += 1
+        self.stderr.write(f'Строка {line}: {message}')
+
+    def build(self, line, record):
+        """Пост или комментарий из записи, None для пропущенной."""
+        try:
+            if isinstance(record, RecordError):
+                raise record
+            if record is None:
+                return None
+            if not isinstance(record, dict):
+                raise RecordError('ожидался объект')
+            kind = record.get('type') or 'post'
+            if kind == 'post':
+                return self.build_post(record)
+            if kind == 'comment':
+                return self.build_comment(line, record)
+            raise RecordError(f'неизвестный тип {kind!r}')
+        except RecordError as error:
+            self.error(line, error)
+            return None
+
+    def common(self, record):
+        """Текст и id автора, общие для постов и комментариев."""
+        text = (record.get('text') or '').strip()
+        if not text:
+            raise RecordError('пустой текст')
+        author_id = self.authors.get(record.get('author'))
+        if author_id is None:
+            raise RecordError(f'нет автора {record.get("author")!r}')
+        return text, author_id
+
+    def build_post(self, record):
+        text, author_id = self.common(record)
+        group_id = None
+        if record.get('group'):
+            group_id = self.groups.get(record['group'])
+            if group_id is None:
+                raise RecordError(f'нет группы {record["group"]!r}')
+        post = Post(author_id=author_id, group_id=group_id, text=text)
+        post.imported_date = parse_date(record.get('pub_date'))
+        return post
+
+    def build_comment(self, line, record):
+        text, author_id = self.common(record)
+        try:
+            post_id = int(record.get('post'))
+        except (TypeError, ValueError):
+            raise RecordError('нужен id поста в поле post')
+        comment = Comment(post_id=post_id, author_id=author_id, text=text)
+        comment.imported_date = parse_date(record.get('created'))
+        comment.line = line
+        return comment
+
+    def insert_posts(self, posts):
+        """Вставляет пачку постов и повторяет побочные эффекты post_save.
+
+        bulk_create не шлёт сигналы, поэтому счётчики, поисковый
+        индекс и ленты подписчиков обновляются здесь по всей пачке
+        сразу. Возвращает пространства имён кеша для сброса.
+        """
+        if not posts:
+            return set()
+        bulk_insert(Post, posts, 'pub_date')
+        authors = Counter(post.author_id for post in posts)
+        groups = Counter(post.group_id for post in posts if post.group_id)
+        counters.posts_imported(authors, groups)
+        search.index_many(
+            search.POST_INDEX, [(post.pk, post.text) for post in posts]
+        )
+        timeline.fan_out_many(posts)
+        return self.namespaces(
+            User.objects.filter(pk__in=authors), list(groups)
+        )
+
+    def existing(self, comments):
+        """Комментарии к существующим постам, остальные — ошибки."""
+        post_ids = set(Post.objects.filter(
+            pk__in={comment.post_id for comment in comments}
+        ).values_list('pk', flat=True))
+        found = []
+        for comment in comments:
+            if comment.post_id in post_ids:
+                found.append(comment)
+            else:
+                self.error(comment.line, f'нет поста {comment.post_id}')
+        return found
+
+    def insert_comments(self, comments):
+        """Вставляет комментарии и повторяет побочные эффекты post_save."""
+        if not comments:
+            return set()
+        bulk_insert(Comment, comments, 'created')
+        posts = Counter(comment.post_id for comment in comments)
+        counters.comments_imported(posts)
+        search.index_many(
+            search.COMMENT_INDEX,
+            [(comment.pk, comment.text) for comment in comments],
+        )
+        return {post_namespace(pk) for pk in posts} | self.namespaces(
+            User.objects.filter(posts__in=posts).distinct(),
+            Group.objects.filter(posts__in=posts).values('pk'),
+        )
+
+    def namespaces(self, users, groups):
+        """Профили и группы, где показаны изменённые посты."""
+        slugs = Group.objects.filter(
+            pk__in=groups
+        ).values_list('slug', flat=True)
+        return {
+            *(profile_namespace(name) for name in users.values_list(
+                'username', flat=True
+            )),
+            *(group_namespace(slug) for slug in slugs),
+        }
@@ -0,0 +1,33 @@
+"""Перестроение полнотекстового индекса постов и комментариев."""
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+
+SOURCES = {
+    search.POST_INDEX: 'posts_post',
+    search.COMMENT_INDEX: 'posts_comment',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Индексирует существующие посты и комментарии пачками, '
+        'каждая пачка в своей транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=search.BATCH_SIZE,
+            help='Сколько строк индексировать за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        if not search.available():
+            raise CommandError('Полнотекстовый индекс есть только в SQLite.')
+        for table, source in SOURCES.items():
+            for done, total in search.rebuild(
+                table, source, options['batch_size']
+            ):
+                self.stdout.write(f'{source}: {done}/{total}')
@@ -0,0 +1,59 @@
+"""Пересчёт денормализованных счётчиков."""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from posts import counters
+from posts.models import Group, Post, Profile, User
+
+CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Сколько строк пересчитывать в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        Profile.objects.bulk_create(
+            (
+                Profile(user_id=pk)
+                for pk in User.objects.filter(
+                    profile__isnull=True
+                ).values_list('pk', flat=True)
+            ),
+            batch_size=chunk_size,
+        )
+        jobs = (
+            (Profile, counters.recount_profiles),
+            (Group, counters.recount_groups),
+            (Post, counters.recount_posts),
+        )
+        for model, recount in jobs:
+            updated = self.recount_in_chunks(model, recount, chunk_size)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {updated}'
+            )
+
+    def recount_in_chunks(self, model, recount, chunk_size):
+        """Пересчитывает диапазоны pk по chunk_size строк."""
+        bounds = model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            return 0
+        updated = 0
+        for start in range(bounds['low'], bounds['high'] + 1, chunk_size):
+            with transaction.atomic():
+                updated += recount(
+                    model.objects.filter(
+                        pk__gte=start,
+                        pk__lt=start + chunk_size,
+                    )
+                )
+        return updated
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:19
+
+from django.db import migrations
+
+TABLES = (
+    ('posts_post_fts', 'posts_post'),
+    ('posts_comment_fts', 'posts_comment'),
+)
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, source in TABLES:
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5('
+            "text, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO {table} (rowid, text) SELECT id, text FROM {source}'
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, _ in TABLES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
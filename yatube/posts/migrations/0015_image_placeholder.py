@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='placeholder',
+            field=models.TextField(blank=True, editable=False, help_text='Размытая миниатюра в виде data URI', verbose_name='Заглушка картинки'),
+        ),
+    ]
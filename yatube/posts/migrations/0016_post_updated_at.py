@@ -0,0 +1,20 @@
+# Generated by Django 2.2.28 on 2026-10-18 07:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_image_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Версия карточки поста в кеше', verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:43
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 500
+
+
+def total(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total')
+        ),
+        0,
+    )
+
+
+def dedupe_follows(apps, schema_editor):
+    """Оставляет самую раннюю из повторяющихся подписок.
+
+    Пары обрабатываются пачками по BATCH_SIZE, затем у затронутых
+    пользователей пересчитываются счётчики подписок.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    Profile = apps.get_model('posts', 'Profile')
+    duplicates = Follow.objects.order_by().values('user', 'author').annotate(
+        keep=Min('pk'), total=Count('pk'),
+    ).filter(total__gt=1)
+    users = set()
+    while True:
+        batch = list(duplicates[:BATCH_SIZE])
+        if not batch:
+            break
+        for row in batch:
+            Follow.objects.filter(
+                user_id=row['user'], author_id=row['author'],
+            ).exclude(pk=row['keep']).delete()
+            users.update((row['user'], row['author']))
+    users = sorted(users)
+    for start in range(0, len(users), BATCH_SIZE):
+        Profile.objects.filter(
+            user_id__in=users[start:start + BATCH_SIZE]
+        ).update(
+            followers_count=total(Follow.objects.all(), 'author'),
+            following_count=total(Follow.objects.all(), 'user'),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0016_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_follows, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='follow',
+            unique_together={('user', 'author')},
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['author', 'user'], name='posts_follow_author_idx'),
+        ),
+    ]
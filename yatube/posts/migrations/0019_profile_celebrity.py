@@ -0,0 +1,30 @@
+# Generated by Django 2.2.28 on 2026-10-18 07:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_celebrities(apps, schema_editor):
+    """Авторы с числом подписчиков у порога уже не раскладывались."""
+    Profile = apps.get_model('posts', 'Profile')
+    Profile.objects.filter(
+        followers_count__gte=getattr(
+            settings, 'TIMELINE_FANOUT_THRESHOLD', 1000
+        ),
+    ).update(celebrity=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='celebrity',
+            field=models.BooleanField(default=False, help_text='Посты не раскладываются по лентам, а подмешиваются при чтении', verbose_name='Популярный автор'),
+        ),
+        migrations.RunPython(mark_celebrities, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,48 @@
 """Подключение модулей."""
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models.signals import post_delete, post_save
 
 User = get_user_model()
 COUNT_CHAR_POST_TEXT = 15
 
 
+class Profile(models.Model):
+    """Счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='profile',
+        on_delete=models.CASCADE,
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Количество подписок',
+        default=0,
+    )
+    celebrity = models.BooleanField(
+        verbose_name='Популярный автор',
+        default=False,
+        help_text='Посты не раскладываются по лентам, а подмешиваются '
+                  'при чтении',
+    )
+
+    def __str__(self) -> str:
+        return self.user.username
+
+    class Meta:
+        """Класс Meta для Profile описание метаданных."""
+        verbose_name = 'profile'
+        verbose_name_plural = 'profiles'
+
+
 class Group(models.Model):
     """Класс Group."""
     title = models.CharField(
@@ -22,6 +59,11 @@ class Group(models.Model):
         verbose_name='Описание группы',
         help_text='Введите описание группы',
     )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0,
+        editable=False,
+    )
 
     def __str__(self) -> str:
         return self.title
@@ -32,6 +74,12 @@ class Group(models.Model):
         verbose_name_plural = 'groups'
 
 
+class PostQuerySet(models.QuerySet):
+    def with_related(self):
+        """Подтягивает автора и группу, которые показывает карточка."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     """Класс Post."""
     text = models.TextField(
@@ -42,6 +90,11 @@ class Post(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True,
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        help_text='Версия карточки поста в кеше',
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -62,15 +115,53 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    placeholder = models.TextField(
+        verbose_name='Заглушка картинки',
+        blank=True,
+        editable=False,
+        help_text='Размытая миниатюра в виде data URI',
+    )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.text[:COUNT_CHAR_POST_TEXT]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает группу и картинку из базы: по ним пересчитываются
+        счётчики и готовятся миниатюры."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_group_id = instance.__dict__.get('group_id')
+        instance._loaded_image = instance.__dict__.get('image')
+        return instance
+
     class Meta:
         """Класс Meta для Posts описание метаданных."""
         ordering = ('-pub_date',)
         verbose_name = 'post'
         verbose_name_plural = 'posts'
+        # Ленты идут в порядке (pub_date, id): id в SQLite — rowid,
+        # который и так замыкает каждый индекс.
+        indexes = [
+            models.Index(
+                fields=('pub_date', 'id'),
+                name='posts_post_feed_idx',
+            ),
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='posts_post_author_feed_idx',
+            ),
+            models.Index(
+                fields=('group', 'pub_date'),
+                name='posts_post_group_feed_idx',
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -102,6 +193,71 @@ class Comment(models.Model):
         """Класс Meta для Comment описание метаданных."""
         verbose_name = 'comment'
         verbose_name_plural = 'comments'
+        indexes = [
+            models.Index(
+                fields=('post', 'created'),
+                name='posts_comment_post_idx',
+            ),
+        ]
+
+
+class FollowQuerySet(models.QuerySet):
+    """Идемпотентные подписка и отписка.
+
+    Сигналы post_save и post_delete (счётчики, лента, кеш) получают
+    сохранённую подписку и приходят, только если запрос действительно
+    добавил или удалил строку, поэтому повторные и параллельные клики
+    ничего не портят.
+    """
+
+    def execute(self, sql, params) -> int:
+        """Число строк, затронутых запросом."""
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def follow(self, user_id, author_id) -> bool:
+        """True, если подписка новая."""
+        # Та же вставка, что у bulk_create(ignore_conflicts=True),
+        # но с числом вставленных строк.
+        ops = connections[self.db].ops
+        opts = self.model._meta
+        columns = ', '.join(
+            ops.quote_name(opts.get_field(name).column)
+            for name in ('user', 'author')
+        )
+        sql = (
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{ops.quote_name(opts.db_table)} ({columns}) VALUES (%s, %s) '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+        )
+        with transaction.atomic(using=self.db):
+            if not self.execute(sql, [user_id, author_id]):
+                return False
+            follow = self.get(user_id=user_id, author_id=author_id)
+            post_save.send(
+                sender=self.model, instance=follow, created=True,
+                update_fields=None, raw=False, using=self.db,
+            )
+        return True
+
+    def unfollow(self, user_id, author_id) -> bool:
+        """True, если подписка была."""
+        ops = connections[self.db].ops
+        opts = self.model._meta
+        sql = (
+            f'DELETE FROM {ops.quote_name(opts.db_table)} '
+            f'WHERE {ops.quote_name(opts.pk.column)} = %s'
+        )
+        with transaction.atomic(using=self.db):
+            follow = self.filter(user_id=user_id, author_id=author_id).first()
+            # Параллельная отписка удалит ноль строк и сигнал не пошлёт.
+            if follow is None or not self.execute(sql, [follow.pk]):
+                return False
+            post_delete.send(
+                sender=self.model, instance=follow, using=self.db,
+            )
+        return True
 
 
 class Follow(models.Model):
@@ -116,6 +272,8 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
     )
 
+    objects = FollowQuerySet.as_manager()
+
     def __str__(self) -> str:
         return self.user.username
 
@@ -123,3 +281,52 @@ class Follow(models.Model):
         """Класс Meta для Follow описание метаданных."""
         verbose_name = 'follow'
         verbose_name_plural = 'follows'
+        unique_together = ('user', 'author')
+        indexes = [
+            models.Index(
+                fields=('author', 'user'),
+                name='posts_follow_author_idx',
+            ),
+        ]
+
+
+class Timeline(models.Model):
+    """Лента подписок пользователя, заполняется при публикации поста."""
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        on_delete=models.CASCADE,
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    def __str__(self) -> str:
+        return f'{self.user_id}: {self.post_id}'
+
+    class Meta:
+        """Класс Meta для Timeline описание метаданных."""
+        ordering = ('-pub_date',)
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=('user', 'pub_date', 'post'),
+                name='posts_timeline_feed_idx',
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='posts_timeline_author_idx',
+            ),
+        ]
+        verbose_name = 'timeline'
+        verbose_name_plural = 'timelines'
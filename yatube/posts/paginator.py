@@ -0,0 +1,207 @@
+"""Пагинация лент по курсору (keyset pagination)."""
+import base64
+import binascii
+
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+CURSOR_PARAM = 'cursor'
+PAGE_PARAM = 'page'
+FORWARD = 'n'
+BACKWARD = 'p'
+# id вне знакового 64-битного диапазона не влезает в INTEGER базы.
+MIN_ID = -2 ** 63
+MAX_ID = 2 ** 63 - 1
+
+
+def encode_cursor(direction, position=None) -> str:
+    """Кодирует направление и позицию в непрозрачный курсор."""
+    value = direction
+    if position is not None:
+        value += '|' + '|'.join(
+            item.isoformat() if hasattr(item, 'isoformat') else str(item)
+            for item in position
+        )
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, parse_key=parse_datetime):
+    """Разбирает курсор, возвращает (direction, position) или None.
+
+    parse_key превращает строку ключа в значение или возвращает None,
+    если ключ не того типа, что у пагинатора.
+    """
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        value = base64.urlsafe_b64decode(cursor + padding).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    direction, *position = value.split('|')
+    if direction not in (FORWARD, BACKWARD):
+        return None
+    if not position:
+        return direction, None
+    if len(position) != 2:
+        return None
+    try:
+        key = parse_key(position[0])
+        pk = int(position[1])
+    except ValueError:
+        return None
+    if key is None or not MIN_ID <= pk <= MAX_ID:
+        return None
+    return direction, (key, pk)
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу (pub_date, id) без COUNT(*) и OFFSET.
+
+    Страницы адресуются курсором `?cursor=...`, старые ссылки вида
+    `?page=N` обслуживаются обычной постраничной навигацией.
+    """
+    ELLIPSIS = '…'
+    # Разбор первого ключа сортировки из курсора.
+    parse_key = staticmethod(parse_datetime)
+
+    def __init__(self, object_list, per_page,
+                 ordering=('-pub_date', '-id'), **kwargs):
+        self.ordering = ordering
+        self.keys = tuple(field.lstrip('-') for field in ordering)
+        self.descending = ordering[0].startswith('-')
+        super().__init__(object_list.order_by(*ordering), per_page, **kwargs)
+        self.numbered = False
+        self.cursor = None
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._number = 1
+        self._has_next = False
+
+    @property
+    def last_cursor(self):
+        """Курсор последней страницы ленты."""
+        return encode_cursor(BACKWARD)
+
+    @cached_property
+    def _total_pages(self):
+        return Paginator.num_pages.func(self)
+
+    @property
+    def num_pages(self):
+        """В режиме курсора число страниц не считается через COUNT(*)."""
+        if self.numbered:
+            return self._total_pages
+        return self._number + int(self._has_next)
+
+    def get_page_from_request(self, params):
+        """Возвращает страницу по параметрам запроса."""
+        cursor = params.get(CURSOR_PARAM)
+        if cursor is None and params.get(PAGE_PARAM) is not None:
+            return self._numbered_page(params.get(PAGE_PARAM))
+        decoded = decode_cursor(cursor, self.parse_key) if cursor else None
+        if decoded is None:
+            return self._cursor_page(FORWARD, None)
+        self.cursor = cursor
+        return self._cursor_page(*decoded)
+
+    def get_elided_page_range(self, number=1, *, on_each_side=3,
+                              on_ends=2):
+        """Номера страниц вокруг текущей и по краям, пропуски — ELLIPSIS.
+
+        Повторяет Paginator.get_elided_page_range из Django 3.2: длина
+        не зависит от общего числа страниц.
+        """
+        number = self.validate_number(number)
+        num_pages = self.num_pages
+        if num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > (1 + on_each_side + on_ends) + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < (num_pages - on_each_side - on_ends) - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(num_pages - on_ends + 1, num_pages + 1)
+        else:
+            yield from range(number + 1, num_pages + 1)
+
+    @property
+    def elided_page_range(self):
+        """Навигация для текущей страницы в шаблоне."""
+        return list(self.get_elided_page_range(self._number))
+
+    def _numbered_page(self, number):
+        """Совместимость со ссылками `?page=N`."""
+        self.numbered = True
+        page = self.get_page(number)
+        self._number = page.number
+        items = list(page.object_list)
+        page.object_list = items
+        if items and page.has_next():
+            self.next_cursor = encode_cursor(FORWARD, self._key(items[-1]))
+        if items and page.has_previous():
+            self.previous_cursor = encode_cursor(
+                BACKWARD, self._key(items[0])
+            )
+        return page
+
+    def _cursor_page(self, direction, position):
+        forward = direction == FORWARD
+        if not forward and position is None:
+            # Курсор на последнюю страницу: читаем с конца ленты.
+            rows = self._fetch(None, False, self.per_page + 1)
+            has_previous, has_next = len(rows) > self.per_page, False
+        else:
+            rows = self._fetch(position, forward, self.per_page + 1)
+            has_more = len(rows) > self.per_page
+            if forward:
+                has_previous, has_next = position is not None, has_more
+            else:
+                has_previous, has_next = has_more, True
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+        if not rows and not forward:
+            return self._cursor_page(FORWARD, None)
+        self._number = 2 if has_previous else 1
+        self._has_next = has_next
+        if rows and has_next:
+            self.next_cursor = encode_cursor(FORWARD, self._key(rows[-1]))
+        if rows and has_previous:
+            self.previous_cursor = encode_cursor(BACKWARD, self._key(rows[0]))
+        return self._get_page(rows, self._number, self)
+
+    def _key(self, obj):
+        return tuple(getattr(obj, key) for key in self.keys)
+
+    def _fetch(self, position, forward, limit):
+        """Выбирает limit объектов после (или до) позиции курсора."""
+        return self.keyset(self.object_list, position, forward, limit)
+
+    def keyset(self, queryset, position, forward, limit, keys=None):
+        """Keyset-выборка из queryset в порядке ленты."""
+        first, second = keys or self.keys
+        desc = forward == self.descending
+        if position is not None:
+            lookup = 'lt' if desc else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{first}__{lookup}': position[0]})
+                | Q(**{first: position[0], f'{second}__{lookup}': position[1]})
+            )
+        prefix = '-' if desc else ''
+        queryset = queryset.order_by(prefix + first, prefix + second)
+        return list(queryset[:limit])
+
+    def validate_number(self, number):
+        if self.numbered:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise InvalidPage('Номер страницы должен быть целым числом')
+        return number
@@ -0,0 +1,188 @@
+"""Полнотекстовый поиск по постам и комментариям (SQLite FTS5).
+
+Индекс хранится в виртуальных таблицах posts_post_fts
+и posts_comment_fts, rowid строки индекса равен id объекта.
+На других СУБД поиск откатывается к icontains.
+"""
+import math
+import re
+
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from .paginator import CursorPaginator
+
+POST_INDEX = 'posts_post_fts'
+COMMENT_INDEX = 'posts_comment_fts'
+BATCH_SIZE = 1000
+WORD_RE = re.compile(r'\w+')
+
+
+def available() -> bool:
+    return connection.vendor == 'sqlite'
+
+
+def match_query(text) -> str:
+    """Превращает ввод пользователя в безопасный запрос FTS5.
+
+    Каждое слово берётся в кавычки, последнее ищется по префиксу.
+    """
+    words = WORD_RE.findall(text)
+    if not words:
+        return ''
+    terms = ['"%s"' % word for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _index(table, pk, text):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [pk])
+        cursor.execute(
+            f'INSERT INTO {table} (rowid, text) VALUES (%s, %s)',
+            [pk, text],
+        )
+
+
+def _unindex(table, pk):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [pk])
+
+
+def index_post(post):
+    _index(POST_INDEX, post.pk, post.text)
+
+
+def unindex_post(post):
+    _unindex(POST_INDEX, post.pk)
+
+
+def index_comment(comment):
+    _index(COMMENT_INDEX, comment.pk, comment.text)
+
+
+def unindex_comment(comment):
+    _unindex(COMMENT_INDEX, comment.pk)
+
+
+def index_many(table, rows):
+    """Добавляет в индекс пары (id, текст) новых объектов."""
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} (rowid, text) VALUES (%s, %s)', rows
+        )
+
+
+def _execute(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall() if cursor.description else None
+
+
+def rebuild(table, source, batch_size=BATCH_SIZE):
+    """Перестраивает индекс на месте пачками по диапазонам id.
+
+    Каждая пачка заменяет строки своего диапазона в отдельной
+    транзакции: запись на сайте ждёт не дольше одной пачки, а поиск
+    всё время видит полный индекс. Отдаёт прогресс.
+    """
+    (low, high), = _execute(f'SELECT MIN(id), MAX(id) FROM {source}')
+    if low is None:
+        with transaction.atomic():
+            _execute(f'DELETE FROM {table}')
+        return
+    for start in range(low, high + 1, batch_size):
+        end = start + batch_size
+        with transaction.atomic():
+            # Первая пачка заодно убирает строки удалённых ранних id.
+            _execute(
+                f'DELETE FROM {table} WHERE rowid >= %s AND rowid < %s',
+                [start if start > low else 0, end],
+            )
+            _execute(
+                f'INSERT INTO {table} (rowid, text)'
+                f' SELECT id, text FROM {source}'
+                ' WHERE id >= %s AND id < %s',
+                [start, end],
+            )
+        yield min(end - 1, high), high
+    # Посты новее high проиндексированы сигналами, удаляем только
+    # строки без объекта.
+    with transaction.atomic():
+        _execute(
+            f'DELETE FROM {table} WHERE rowid > %s'
+            f' AND rowid NOT IN (SELECT id FROM {source} WHERE id > %s)',
+            [high, high],
+        )
+
+
+def search(queryset, text, table=POST_INDEX):
+    """Отбирает из queryset объекты, подходящие под запрос."""
+    query = match_query(text)
+    if not query:
+        return queryset.none()
+    if not available():
+        return queryset.filter(text__icontains=text)
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [query]
+    ))
+
+
+def ranked(queryset, text):
+    """Посты под запрос с рангом bm25 (меньше — релевантнее)."""
+    query = match_query(text)
+    if not query:
+        return queryset.none().extra(select={'rank': '0'})
+    if not available():
+        return queryset.filter(text__icontains=text).extra(
+            select={'rank': '0'}
+        )
+    return queryset.extra(
+        select={'rank': f'bm25({POST_INDEX})'},
+        tables=[POST_INDEX],
+        where=[
+            f'{POST_INDEX}.rowid = posts_post.id',
+            f'{POST_INDEX} MATCH %s',
+        ],
+        params=[query],
+    )
+
+
+def parse_rank(value):
+    """Ранг из курсора; None для нечисловых и бесконечных значений."""
+    rank = float(value)
+    return rank if math.isfinite(rank) else None
+
+
+class SearchPaginator(CursorPaginator):
+    """Курсорная пагинация результатов поиска по (rank, id)."""
+    parse_key = staticmethod(parse_rank)
+
+    def __init__(self, queryset, text, per_page, **kwargs):
+        super().__init__(
+            ranked(queryset, text), per_page, ordering=('rank', 'id'),
+            **kwargs
+        )
+
+    def keyset(self, queryset, position, forward, limit, keys=None):
+        desc = forward == self.descending
+        if position is not None:
+            sign = '<' if desc else '>'
+            rank = queryset.query.extra['rank'][0]
+            queryset = queryset.extra(
+                where=[
+                    f'({rank} {sign} %s OR'
+                    f' ({rank} = %s AND posts_post.id {sign} %s))'
+                ],
+                params=[position[0], position[0], position[1]],
+            )
+        prefix = '-' if desc else ''
+        return list(
+            queryset.order_by(prefix + 'rank', prefix + 'id')[:limit]
+        )
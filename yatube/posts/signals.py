@@ -0,0 +1,126 @@
+"""Обработчики сигналов моделей приложения Posts."""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import (counters, following, invalidation, search, thumbnails,
+               timeline)
+from .models import Comment, Follow, Group, Post, Profile, User
+
+
+# Поля пользователя, которые показывает карточка поста.
+CARD_USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Запоминает, изменилось ли имя, показанное в карточках постов."""
+    instance._card_changed = False
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(
+        CARD_USER_FIELDS
+    ):
+        return
+    old = User.objects.filter(pk=instance.pk).values(*CARD_USER_FIELDS)
+    old = old.first()
+    instance._card_changed = old is not None and any(
+        old[field] != getattr(instance, field) for field in CARD_USER_FIELDS
+    )
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    """Создаёт профиль со счётчиками нового пользователя, при смене
+    имени обновляет версию карточек его постов."""
+    if created and not raw:
+        Profile.objects.get_or_create(user=instance)
+    if getattr(instance, '_card_changed', False):
+        Post.objects.filter(author=instance).update(updated_at=timezone.now())
+        invalidation.invalidate_author(instance)
+        instance._card_changed = False
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    """Раскладывает новый пост в ленты подписчиков, ведёт счётчики
+    и заказывает миниатюры новой картинки."""
+    if raw:
+        return
+    loaded_group_id = getattr(instance, '_loaded_group_id', instance.group_id)
+    if created:
+        counters.post_added(instance.author_id, instance.group_id)
+        timeline.fan_out(instance)
+    else:
+        counters.post_moved(loaded_group_id, instance.group_id)
+    image = instance.image.name or ''
+    if image != (getattr(instance, '_loaded_image', None) or ''):
+        if instance.placeholder:
+            Post.objects.filter(pk=instance.pk).update(placeholder='')
+            instance.placeholder = ''
+        thumbnails.schedule(image)
+    search.index_post(instance)
+    invalidation.invalidate_post(instance, group_ids=[loaded_group_id])
+    instance._loaded_group_id = instance.group_id
+    instance._loaded_image = image
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    loaded_group_id = getattr(instance, '_loaded_group_id', instance.group_id)
+    counters.post_removed(instance.author_id, loaded_group_id)
+    search.unindex_post(instance)
+    invalidation.invalidate_post(instance, group_ids=[loaded_group_id])
+
+
+def _invalidate_comment_post(comment):
+    post = Post.objects.filter(
+        pk=comment.post_id
+    ).only('id', 'author', 'group').first()
+    if post is not None:
+        invalidation.invalidate_post(post)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.comment_added(instance.post_id)
+    search.index_comment(instance)
+    _invalidate_comment_post(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.comment_removed(instance.post_id)
+    search.unindex_comment(instance)
+    _invalidate_comment_post(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidation.invalidate_group(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    """Заполняет ленту после подписки."""
+    if created and not raw:
+        counters.follow_added(instance.user_id, instance.author_id)
+        timeline.follower_added(instance.author_id)
+        timeline.backfill(instance.user_id, instance.author_id)
+        invalidation.invalidate_follow(instance)
+        following.invalidate(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """Чистит ленту после отписки."""
+    counters.follow_removed(instance.user_id, instance.author_id)
+    timeline.prune(instance.user_id, instance.author_id)
+    timeline.follower_removed(instance.author_id)
+    invalidation.invalidate_follow(instance)
+    following.invalidate(instance.user_id)
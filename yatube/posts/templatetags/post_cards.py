@@ -0,0 +1,66 @@
+from django import template
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from posts import following
+
+register = template.Library()
+
+CARD_TEMPLATE = 'includes/post.html'
+
+
+def card_key(post, show_group_link, show_profile_link) -> str:
+    """Ключ карточки: меняется вместе со всем, что она показывает."""
+    state = getattr(post, 'following', None)
+    return 'card:{}:{}:{}:{}:{:d}{:d}{:d}{}'.format(
+        post.pk,
+        post.updated_at.timestamp(),
+        post.comments_count,
+        post.group.slug if post.group_id else '',
+        show_group_link,
+        show_profile_link,
+        bool(getattr(post, 'srcset', '')),
+        '-' if state is None else int(state),
+    )
+
+
+def _user(context):
+    return context.get('user') or AnonymousUser()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts, show_group_link=False,
+               show_profile_link=False):
+    """HTML карточек постов страницы из кеша.
+
+    Все карточки страницы читаются одним get_many, рендерятся
+    и записываются одним set_many только отсутствующие. Подписка
+    на авторов проверяется для всей страницы сразу.
+    """
+    if show_profile_link:
+        following.annotate(posts, _user(context))
+    cards = {
+        card_key(post, show_group_link, show_profile_link): post
+        for post in posts
+    }
+    found = cache.get_many(cards)
+    missing = {
+        key: render_to_string(CARD_TEMPLATE, {
+            'post': post,
+            'SHOW_GROUP_LINK': show_group_link,
+            'SHOW_PROFILE_LINK': show_profile_link,
+        })
+        for key, post in cards.items() if key not in found
+    }
+    if missing:
+        cache.set_many(missing, settings.FEED_CACHE_TIMEOUT)
+    found.update(missing)
+    return [mark_safe(found[key]) for key in cards]
+
+
+@register.simple_tag(takes_context=True)
+def following_key(context):
+    """Для ключа {% cache %} лент с кнопками подписки."""
+    return following.fingerprint(_user(context))
@@ -1,11 +1,13 @@
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import BytesIO
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 from posts.models import Comment, Group, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -292,6 +294,64 @@ class PostsFormTests(TestCase):
             ).exists()
         )
 
+    @staticmethod
+    def photo(size, orientation=1, image_format='JPEG'):
+        """Картинка с поворотом и камерой в EXIF."""
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        exif[0x0110] = 'Camera'
+        exif[0x010F] = 'CameraMaker'
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, image_format, exif=exif)
+        extension = image_format.lower()
+        return SimpleUploadedFile(
+            f'photo.{extension}', buffer.getvalue(),
+            content_type=f'image/{extension}',
+        )
+
+    @override_settings(IMAGE_MAX_DIMENSION=100)
+    def test_image_normalized(self):
+        """Картинка поворачивается по EXIF, уменьшается
+        и сохраняется без метаданных."""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с фотографией', 'image': self.photo(
+                (400, 200), orientation=6
+            )},
+        )
+        post = Post.objects.get(text='Пост с фотографией')
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (50, 100))
+            self.assertEqual(len(image.getexif()), 0)
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с PNG', 'image': self.photo(
+                (400, 200), image_format='PNG'
+            )},
+        )
+        post = Post.objects.get(text='Пост с PNG')
+        with Image.open(post.image) as image:
+            self.assertEqual(image.format, 'PNG')
+            self.assertNotIn('exif', image.info)
+            self.assertEqual(len(image.getexif()), 0)
+
+    @override_settings(IMAGE_MAX_PIXELS=1000)
+    def test_image_too_many_pixels(self):
+        """Картинка с огромным разрешением отбраковывается."""
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с огромным фото', 'image': self.photo(
+                (100, 100)
+            )},
+        )
+        self.assertFormError(
+            response, 'form', 'image',
+            'Слишком большое разрешение картинки.',
+        )
+        self.assertFalse(
+            Post.objects.filter(text='Пост с огромным фото').exists()
+        )
+
     def test_created_comment(self):
         """Тест на проверку создания комментариев для не авторизованного."""
         post = PostsFormTests.post
@@ -0,0 +1,108 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, User
+
+# Таблицы лент: по ним не должно быть полного прохода и сортировки
+# во временном B-дереве.
+FEED_TABLES = (
+    'posts_post', 'posts_comment', 'posts_timeline', 'posts_follow',
+)
+FULL_SCAN_RE = re.compile(
+    r'\bSCAN (?:TABLE )?(%s)\b(?! USING)' % '|'.join(FEED_TABLES)
+)
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+class FeedIndexTests(TestCase):
+    """Запросы лент идут по составным индексам."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {number}',
+                slug=f'group{number}',
+                description='Описание',
+            )
+            for number in range(3)
+        ]
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(5)
+        ]
+        cls.reader = User.objects.create_user(username='reader')
+        for author in cls.authors[:3]:
+            Follow.objects.create(user=cls.reader, author=author)
+        Post.objects.bulk_create(
+            Post(
+                author=cls.authors[number % len(cls.authors)],
+                group=cls.groups[number % len(cls.groups)],
+                text=f'Пост {number}',
+            )
+            for number in range(120)
+        )
+        cls.post = Post.objects.first()
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=author, text='Комментарий')
+            for author in cls.authors
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(FeedIndexTests.reader)
+
+    def urls(self):
+        author = FeedIndexTests.authors[0].username
+        group = FeedIndexTests.groups[0].slug
+        return {
+            'index': reverse('posts:index'),
+            'group_list': reverse('posts:group_list', args=[group]),
+            'profile': reverse('posts:profile', args=[author]),
+            'follow_index': reverse('posts:follow_index'),
+            'post_detail': reverse(
+                'posts:post_detail', args=[FeedIndexTests.post.pk]
+            ),
+        }
+
+    def plans(self, url, params=None):
+        """Планы SELECT-запросов страницы к таблицам лент."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query['sql']
+                if (not sql.startswith('SELECT')
+                        or not any(table in sql for table in FEED_TABLES)):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plans.append((sql, '\n'.join(
+                    str(row[-1]) for row in cursor.fetchall()
+                )))
+        return response, plans
+
+    def assertIndexed(self, plans):
+        for sql, plan in plans:
+            self.assertIsNone(FULL_SCAN_RE.search(plan), f'{sql}\n{plan}')
+            self.assertNotIn(TEMP_SORT, plan, f'{sql}\n{plan}')
+
+    def test_feed_pages(self):
+        """Первые и следующие страницы лент не сортируют и не сканируют."""
+        for name, url in self.urls().items():
+            with self.subTest(view=name):
+                response, plans = self.plans(url)
+                self.assertTrue(plans)
+                self.assertIndexed(plans)
+                page_obj = response.context.get('page_obj')
+                if page_obj is not None and page_obj.paginator.next_cursor:
+                    _, plans = self.plans(
+                        url, {'cursor': page_obj.paginator.next_cursor}
+                    )
+                    self.assertIndexed(plans)
@@ -1,5 +1,18 @@
+import hashlib
+import json
+import os
+import tempfile
+from io import StringIO
+
+from core.models import Checkpoint
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_delete, post_save
 from django.test import TestCase
-from posts.models import COUNT_CHAR_POST_TEXT, Comment, Group, Post, User
+from posts import search
+from posts.management.commands.import_posts import CHECKPOINT
+from posts.models import (COUNT_CHAR_POST_TEXT, Comment, Follow, Group, Post,
+                          Profile, Timeline, User)
 
 
 class PostModelTest(TestCase):
@@ -132,3 +145,196 @@ class CommentModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     comment._meta.get_field(field).help_text, expected_value)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_slug',
+            description='Тестовое описание',
+        )
+
+    def assertCounters(self, posts, group_posts):
+        self.user.profile.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(self.user.profile.posts_count, posts)
+        self.assertEqual(self.group.posts_count, group_posts)
+
+    def test_post_counters(self):
+        """Счётчики постов автора и группы меняются с постами."""
+        post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            group=self.group,
+        )
+        self.assertCounters(posts=1, group_posts=1)
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertCounters(posts=1, group_posts=0)
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.other_group.posts_count, 1)
+        post.delete()
+        self.other_group.refresh_from_db()
+        self.assertCounters(posts=0, group_posts=0)
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_comment_and_follow_counters(self):
+        """Счётчики комментариев и подписок меняются с объектами."""
+        post = Post.objects.create(author=self.user, text='Тестовый пост')
+        comment = Comment.objects.create(
+            post=post,
+            author=self.follower,
+            text='Комментарий',
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        follow = Follow.objects.create(user=self.follower, author=self.user)
+        self.assertEqual(
+            Profile.objects.get(user=self.user).followers_count, 1
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.follower).following_count, 1
+        )
+        follow.delete()
+        self.assertEqual(
+            Profile.objects.get(user=self.user).followers_count, 0
+        )
+
+    def test_follow_idempotent(self):
+        """Повторные подписка и отписка не дублируют строки и счётчики."""
+        self.assertTrue(Follow.objects.follow(self.follower.pk, self.user.pk))
+        self.assertFalse(
+            Follow.objects.follow(self.follower.pk, self.user.pk)
+        )
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            Profile.objects.get(user=self.user).followers_count, 1
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.follower, author=self.user)
+        self.assertTrue(
+            Follow.objects.unfollow(self.follower.pk, self.user.pk)
+        )
+        self.assertFalse(
+            Follow.objects.unfollow(self.follower.pk, self.user.pk)
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.user).followers_count, 0
+        )
+
+    def test_follow_signals_get_saved_instance(self):
+        """Сигналы подписки получают сохранённую подписку с pk."""
+        received = []
+
+        def receiver(sender, instance, **kwargs):
+            received.append(instance.pk)
+
+        post_save.connect(receiver, sender=Follow)
+        post_delete.connect(receiver, sender=Follow)
+        self.addCleanup(post_save.disconnect, receiver, sender=Follow)
+        self.addCleanup(post_delete.disconnect, receiver, sender=Follow)
+        Follow.objects.follow(self.follower.pk, self.user.pk)
+        pk = Follow.objects.get().pk
+        Follow.objects.unfollow(self.follower.pk, self.user.pk)
+        self.assertEqual(received, [pk, pk])
+
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет разошедшиеся счётчики."""
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Пост %s' % i, group=self.group)
+            for i in range(3)
+        ])
+        Profile.objects.filter(user=self.follower).delete()
+        call_command('recount', chunk_size=1, stdout=StringIO())
+        self.assertCounters(posts=3, group_posts=3)
+        self.assertTrue(Profile.objects.filter(user=self.follower).exists())
+
+    def write(self, suffix, content):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w', encoding='utf-8') as file:
+            file.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_import_posts(self):
+        """import_posts вставляет пачками и обновляет производные данные."""
+        Follow.objects.follow(self.follower.pk, self.user.pk)
+        records = [
+            {'author': 'auth', 'group': 'test_slug', 'text': 'Котик 1',
+             'pub_date': '2020-01-02T03:04:05'},
+            {'author': 'auth', 'text': 'Котик 2'},
+            {'author': 'nobody', 'text': 'Без автора'},
+            {'author': 'auth', 'group': 'missing', 'text': 'Без группы'},
+        ]
+        post = Post.objects.create(author=self.user, text='Старый пост')
+        lines = [json.dumps(record) for record in records] + [
+            '{"author": "auth", "text": ',
+            json.dumps({'type': 'comment', 'post': post.pk,
+                        'author': 'follower', 'text': 'Котик в комментарии'}),
+            json.dumps({'type': 'comment', 'post': 0,
+                        'author': 'auth', 'text': 'Комментарий'}),
+        ]
+        path = self.write('.jsonl', '\n'.join(lines))
+        out, err = StringIO(), StringIO()
+        call_command(
+            'import_posts', path, batch_size=2, stdout=out, stderr=err
+        )
+        self.assertIn('Готово, ошибок: 4', out.getvalue())
+        self.assertIn('Строка 3', err.getvalue())
+        self.assertIn('Строка 5: некорректный JSON', err.getvalue())
+        self.assertIn('Строка 7: нет поста 0', err.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment = search.search(
+            Comment.objects.all(), 'котик', search.COMMENT_INDEX
+        ).get()
+        self.assertEqual(comment.post, post)
+        self.assertCounters(posts=3, group_posts=1)
+        post = Post.objects.get(text='Котик 1')
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(
+            Timeline.objects.filter(
+                user=self.follower, post__text__startswith='Котик'
+            ).count(),
+            2,
+        )
+        self.assertEqual(
+            search.ranked(Post.objects.all(), 'котик').count(), 2
+        )
+
+    def test_import_posts_resumes_from_checkpoint(self):
+        """Повторный запуск пропускает уже импортированные строки."""
+        path = self.write(
+            '.csv',
+            'author,group,text\n'
+            'auth,test_slug,Первый\n'
+            'auth,,Второй\n'
+            'auth,other_slug,Третий\n',
+        )
+        name = CHECKPOINT.format(
+            hashlib.md5(os.path.abspath(path).encode()).hexdigest()
+        )
+        Checkpoint.objects.advance(name, 2)
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Третий']
+        )
+        self.assertFalse(Checkpoint.objects.filter(name=name).exists())
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 4)
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.other_group.posts_count, 2)
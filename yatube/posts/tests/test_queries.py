@@ -0,0 +1,126 @@
+from core.testing import QueryBudgetMixin
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import following
+from posts.models import Comment, Follow, Group, Post, User
+
+COUNT_AUTHORS = 5
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Страница грузится за фиксированное число запросов."""
+
+    # Сессия и пользователь берутся из кеша и в бюджет не входят,
+    # подписки читателя — один запрос при холодном кеше.
+    BUDGETS = {
+        'index': 2,
+        'group_list': 3,
+        'profile': 3,
+        'follow_index': 3,
+        'post_detail': 2,
+        'search': 3,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='budget',
+            description='Описание',
+        )
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(COUNT_AUTHORS)
+        ]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+            for number in range(3):
+                Post.objects.create(
+                    author=author,
+                    group=cls.group,
+                    text=f'Пост про бюджет {number}',
+                )
+        cls.post = Post.objects.filter(author=cls.authors[0]).first()
+        for author in cls.authors:
+            Comment.objects.create(
+                post=cls.post, author=author, text='Комментарий'
+            )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(QueryBudgetTests.reader)
+        # Первый запрос кладёт пользователя в кеш сессий.
+        self.client.get(reverse('about:author'))
+        cache.clear()
+
+    def urls(self):
+        author = QueryBudgetTests.authors[0]
+        return {
+            'index': reverse('posts:index'),
+            'group_list': reverse(
+                'posts:group_list', args=[QueryBudgetTests.group.slug]
+            ),
+            'profile': reverse('posts:profile', args=[author.username]),
+            'follow_index': reverse('posts:follow_index'),
+            'post_detail': reverse(
+                'posts:post_detail', args=[QueryBudgetTests.post.pk]
+            ),
+            'search': reverse('posts:search') + '?q=бюджет',
+        }
+
+    def test_budgets(self):
+        """Запросов не больше бюджета страницы."""
+        for name, url in self.urls().items():
+            with self.subTest(view=name):
+                cache.clear()
+                with self.assertMaxQueries(self.BUDGETS[name]):
+                    self.client.get(url)
+
+    def test_independent_of_page_size(self):
+        """Число запросов не зависит от числа постов на странице."""
+        url = reverse('posts:index')
+        counts = []
+        for _ in range(2):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            counts.append(len(queries))
+            Post.objects.filter(pk__in=list(
+                Post.objects.values_list('pk', flat=True)[:COUNT_AUTHORS * 2]
+            )).delete()
+        self.assertEqual(counts[0], counts[1])
+
+    def test_following_ids_cached(self):
+        """Подписки читаются одним запросом, затем из кеша."""
+        reader = User.objects.get(pk=QueryBudgetTests.reader.pk)
+        author = QueryBudgetTests.authors[0]
+        with self.assertNumQueries(1):
+            self.assertIn(author.pk, following.following_ids(reader))
+        reader = User.objects.get(pk=reader.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(following.is_following(reader, author.pk))
+        Follow.objects.filter(user=reader, author=author).delete()
+        reader = User.objects.get(pk=reader.pk)
+        self.assertFalse(following.is_following(reader, author.pk))
+
+    def test_follow_buttons_in_feed(self):
+        """Лента показывает кнопки подписки по состоянию читателя."""
+        author = QueryBudgetTests.authors[-1]
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response,
+            reverse('posts:profile_unfollow', args=[author.username]),
+        )
+        Follow.objects.filter(
+            user=QueryBudgetTests.reader, author=author
+        ).delete()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response,
+            reverse('posts:profile_follow', args=[author.username]),
+        )
@@ -107,3 +107,35 @@ class PostsURLTests(TestCase):
             with self.subTest(address=address):
                 response = self.authorized_client.get(address)
                 self.assertTemplateUsed(response, template)
+
+    def test_anonymous_page_cache(self):
+        """Анонимная страница отдаётся из кеша и поддерживает
+        условные запросы по ETag и Last-Modified.
+        """
+        post = PostsURLTests.post
+        url = f'/posts/{post.id}/'
+        response = self.guest_client.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        cached = self.guest_client.get(url)
+        self.assertEqual(cached.content, response.content)
+        self.assertIsNone(cached.context)
+        not_modified = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, HTTPStatus.NOT_MODIFIED)
+        not_modified = self.guest_client.get(
+            url,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(not_modified.status_code, HTTPStatus.NOT_MODIFIED)
+        post.text = 'Изменённый текст поста'
+        post.save()
+        changed = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, HTTPStatus.OK)
+        self.assertContains(changed, post.text)
+
+    def test_authorized_pages_not_cached(self):
+        """Авторизованный пользователь получает отрисованную страницу."""
+        self.authorized_client.get('/')
+        response = self.authorized_client.get('/')
+        self.assertIsNotNone(response.context)
+        self.assertFalse(response.has_header('ETag'))
@@ -1,13 +1,25 @@
 import shutil
 import tempfile
+from io import StringIO
 
+from core.cache import bump
+from core.models import Checkpoint
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
-from posts.models import Comment, Follow, Group, Post, User
+from posts.invalidation import INDEX
+from posts.management.commands.generate_thumbnails import CHECKPOINT
+from posts import search, timeline
+from posts.models import (Comment, Follow, Group, Post, Profile, Timeline,
+                          User)
+from posts.paginator import encode_cursor
+from posts.thumbnails import FEED_SIZE, THUMBNAIL_SIZES, generate
+from posts.views import COUNT_COMMENTS
+from sorl.thumbnail import get_thumbnail
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -181,6 +193,31 @@ class PostsPagesTests(TestCase):
             'Комментарий относится не к этому посту'
         )
 
+    def test_post_detail_comments_paginated(self):
+        """Комментарии показываются порциями, остальные — фрагментом."""
+        post = PostsPagesTests.post
+        Comment.objects.bulk_create(
+            Comment(post=post, author=PostsPagesTests.user, text=f'Ещё {i}')
+            for i in range(COUNT_COMMENTS)
+        )
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=[post.id])
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COUNT_COMMENTS)
+        self.assertEqual(comments[0], PostsPagesTests.comment)
+        self.assertContains(response, reverse(
+            'posts:post_comments', args=[post.id]
+        ))
+        response = self.authorized_client.get(
+            reverse('posts:post_comments', args=[post.id]),
+            {'cursor': comments.paginator.next_cursor},
+        )
+        self.assertTemplateUsed(response, 'includes/comment_list.html')
+        self.assertEqual(len(response.context['comments']), 1)
+        self.assertContains(response, f'Ещё {COUNT_COMMENTS - 1}')
+        self.assertNotContains(response, 'comments-more')
+
     def test_urls_show_correct_image(self):
         """Пост с картинкой показавает на главной странице,
         на странице профайла, на странице группы
@@ -221,6 +258,46 @@ class PostsPagesTests(TestCase):
             'Не та картинка.'
         )
 
+    def test_generate_thumbnails(self):
+        """Команда готовит миниатюры всех размеров из шаблонов
+        и продолжает с контрольной точки."""
+        out = StringIO()
+        call_command('generate_thumbnails', processes=1, stdout=out)
+        self.assertIn('1/1', out.getvalue())
+        for geometry, options in THUMBNAIL_SIZES:
+            self.assertTrue(
+                get_thumbnail(self.post.image, geometry, **options).exists()
+            )
+        Checkpoint.objects.advance(CHECKPOINT, self.post.pk)
+        out = StringIO()
+        call_command('generate_thumbnails', processes=1, stdout=out)
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            [f'Продолжение с поста {self.post.pk}', 'Готово, ошибок: 0'],
+        )
+        self.assertFalse(Checkpoint.objects.exists())
+
+    def test_feed_prefetches_thumbnails(self):
+        """Лента получает готовые миниатюры страницы разом."""
+        generate(self.post.image.name)
+        response = self.authorized_client.get(reverse('posts:index'))
+        post = next(
+            post for post in response.context['page_obj']
+            if post.pk == self.post.pk
+        )
+        geometry, options = FEED_SIZE
+        self.assertEqual(
+            post.thumbnail.url,
+            get_thumbnail(self.post.image, geometry, **options).url,
+        )
+        self.assertEqual(
+            [entry.split()[1] for entry in post.srcset.split(', ')],
+            ['280w', '560w', '1120w'],
+        )
+        self.assertTrue(post.placeholder.startswith('data:image/jpeg'))
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, 'loading="lazy"')
+
     def test_new_post_show_urls(self):
         """Пост с группой показан на главной странице,
         на странице группы и автора поста.
@@ -279,13 +356,64 @@ class PostsPagesTests(TestCase):
         """Проверка кеша на главной странице"""
         url = reverse('posts:index')
         response_old = self.authorized_client.get(url)
-        self.post_cache.delete()
+        Post.objects.filter(pk=self.post_cache.pk).update(text='Без сигнала')
         response = self.authorized_client.get(url)
         self.assertEqual(response.content, response_old.content)
         cache.clear()
         response_new = self.authorized_client.get(url)
         self.assertNotEqual(response.content, response_new.content)
 
+    def test_cache_invalidated_by_changes(self):
+        """Изменение и удаление поста сбрасывает кеш лент."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse(
+                'posts:profile',
+                kwargs={'username': self.post.author.username}
+            ),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.authorized_client.get(url)
+                post = Post.objects.get(pk=self.post.pk)
+                post.text = f'Новый текст для {url}'
+                post.save()
+                response = self.authorized_client.get(url)
+                self.assertContains(response, post.text)
+        post.delete()
+        response = self.authorized_client.get(urls[0])
+        self.assertNotContains(response, post.text)
+
+    def test_post_page_follows_group_changes(self):
+        """Кеш страницы поста сбрасывается при правке его группы."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        guest = Client()
+        self.assertContains(guest.get(url), self.group.title)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Переименованная группа'
+        group.slug = 'renamed_slug'
+        group.save()
+        response = guest.get(url)
+        self.assertContains(response, group.title)
+        self.assertContains(response, 'renamed_slug')
+
+    def test_post_cards_cached(self):
+        """Карточки постов берутся из кеша, пока не сменится версия."""
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Тайная правка')
+        bump(INDEX)
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Тестовый пост')
+        self.assertNotContains(response, 'Тайная правка')
+        author = User.objects.get(pk=PostsPagesTests.user.pk)
+        author.first_name = 'Новое имя'
+        author.save()
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Тайная правка')
+        self.assertContains(response, 'Новое имя')
+
     def test_profile_follow_work(self):
         """Тест на создания новой подписки у авторизованного пользователя."""
         follow_count = Follow.objects.filter(user=self.user).count()
@@ -360,6 +488,97 @@ class PostsPagesTests(TestCase):
             0,
         )
 
+    def test_new_post_fanned_out_to_timeline(self):
+        """Новый пост попадает в ленту подписчика,
+        отписка убирает посты автора из ленты."""
+        post = Post.objects.create(
+            author=self.another_user,
+            text='Пост в ленту подписчика.'
+        )
+        self.assertTrue(
+            Timeline.objects.filter(
+                user=PostsPagesTests.user,
+                post=post,
+            ).exists()
+        )
+        self.author_client.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': self.another_user.username}
+            )
+        )
+        self.assertFalse(
+            Timeline.objects.filter(user=PostsPagesTests.user).exists()
+        )
+
+    @override_settings(TIMELINE_FANOUT_THRESHOLD=1)
+    def test_celebrity_posts_merged_on_read(self):
+        """Посты популярных авторов подмешиваются в ленту при чтении."""
+        timeline.follower_added(self.another_user.pk)
+        post = Post.objects.create(
+            author=self.another_user,
+            text='Пост популярного автора.'
+        )
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        response = self.author_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            response.context.get('page_obj').object_list[0],
+            post,
+        )
+
+    @override_settings(
+        TIMELINE_FANOUT_THRESHOLD=3, TIMELINE_FANOUT_LOW_THRESHOLD=2
+    )
+    def test_timeline_materialized_after_request(self):
+        """Автор ниже нижнего порога раскладывается в фоне, а до того
+        его посты подмешиваются при чтении."""
+        author = User.objects.create_user(username='celebrity')
+        first, second, third, fourth = (
+            User.objects.create_user(username=f'reader_{i}')
+            for i in range(4)
+        )
+
+        def feed(user):
+            client = Client()
+            client.force_login(user)
+            response = client.get(reverse('posts:follow_index'))
+            return [
+                post.text for post in response.context['page_obj']
+                if post.author_id == author.pk
+            ]
+
+        rows = Timeline.objects.filter(author=author)
+        Follow.objects.follow(first.pk, author.pk)
+        Post.objects.create(author=author, text='p1')
+        Follow.objects.follow(second.pk, author.pk)
+        Follow.objects.follow(third.pk, author.pk)
+        Post.objects.create(author=author, text='p2')
+        Follow.objects.follow(fourth.pk, author.pk)
+        self.assertEqual(rows.count(), 2)
+        for reader in (third, second, first):
+            Follow.objects.unfollow(reader.pk, author.pk)
+        self.assertFalse(rows.exists())
+        self.assertEqual(feed(fourth), ['p2', 'p1'])
+        timeline.materialize(author.pk)
+        self.assertEqual(rows.filter(user=fourth).count(), 2)
+        self.assertFalse(Profile.objects.get(user=author).celebrity)
+        self.assertEqual(feed(fourth), ['p2', 'p1'])
+
+    @override_settings(TIMELINE_FANOUT_THRESHOLD=2)
+    def test_threshold_hysteresis(self):
+        """Подписка-отписка у порога не снимает отметку популярности."""
+        author = User.objects.create_user(username='celebrity')
+        readers = [
+            User.objects.create_user(username=f'reader_{i}')
+            for i in range(2)
+        ]
+        for reader in readers:
+            Follow.objects.follow(reader.pk, author.pk)
+        for _ in range(3):
+            Follow.objects.unfollow(readers[0].pk, author.pk)
+            Follow.objects.follow(readers[0].pk, author.pk)
+        self.assertTrue(Profile.objects.get(user=author).celebrity)
+
 
 class PaginatorViewsTest(TestCase):
     COUNT_POST = 15
@@ -428,3 +647,151 @@ class PaginatorViewsTest(TestCase):
                     self.COUNT_POST - self.COUNT_POST_PAGE,
                     'Количество записей не совпадает.'
                 )
+
+    def test_cursor_pages(self):
+        """Курсоры ведут на следующую, предыдущую и последнюю страницы."""
+        url = reverse('posts:index')
+        first = self.authorized_client.get(url).context['page_obj']
+        self.assertTrue(first.has_next())
+        self.assertFalse(first.has_previous())
+        second = self.authorized_client.get(
+            url, {'cursor': first.paginator.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            len(second.object_list),
+            self.COUNT_POST - self.COUNT_POST_PAGE,
+        )
+        self.assertFalse(second.has_next())
+        self.assertTrue(second.has_previous())
+        previous = self.authorized_client.get(
+            url, {'cursor': second.paginator.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            list(previous.object_list),
+            list(first.object_list),
+        )
+        last = self.authorized_client.get(
+            url, {'cursor': first.paginator.last_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(last.object_list), self.COUNT_POST_PAGE)
+        self.assertEqual(last.object_list[-1], second.object_list[-1])
+        self.assertFalse(last.has_next())
+        self.assertTrue(last.has_previous())
+
+    def test_elided_page_range(self):
+        """Номера страниц сокращаются до окна вокруг текущей."""
+        Post.objects.bulk_create(
+            Post(text='Ещё пост %s' % i, author=PaginatorViewsTest.user)
+            for i in range(self.COUNT_POST_PAGE * 20)
+        )
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'page': 10}
+        )
+        paginator = response.context['page_obj'].paginator
+        self.assertEqual(
+            paginator.elided_page_range,
+            [1, 2, '…', 7, 8, 9, 10, 11, 12, 13, '…', 21, 22],
+        )
+        self.assertContains(response, '…', count=2)
+        self.assertNotContains(response, 'page=15')
+
+    def test_invalid_cursor_shows_first_page(self):
+        """Испорченный курсор или ключ не того типа — первая страница."""
+        for cursor in ('%%%', encode_cursor('n', (1.5, 3)),
+                       encode_cursor('n', ('2020-01-01T00:00:00', 10 ** 23)),
+                       encode_cursor('p', ('nan', 1))):
+            with self.subTest(cursor=cursor):
+                response = self.authorized_client.get(
+                    reverse('posts:index'), {'cursor': cursor}
+                )
+                self.assertEqual(
+                    len(response.context['page_obj'].object_list),
+                    self.COUNT_POST_PAGE,
+                )
+
+
+class SearchViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Приключения котика в деревне',
+            group=cls.group,
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.other,
+            text='Котики и собаки',
+        )
+        Post.objects.create(author=cls.user, text='Рецепт борща')
+
+    def search(self, **params):
+        response = self.client.get(reverse('posts:search'), params)
+        return list(response.context['page_obj'].object_list)
+
+    def test_search_by_prefix(self):
+        """Поиск находит посты по префиксу слова."""
+        self.assertCountEqual(
+            self.search(q='котик'),
+            [self.post, self.other_post],
+        )
+        self.assertEqual(self.search(q='пирог'), [])
+
+    def test_search_filters(self):
+        """Поиск фильтрует по группе и автору."""
+        self.assertEqual(
+            self.search(q='котик', group=self.group.slug),
+            [self.post],
+        )
+        self.assertEqual(
+            self.search(q='котик', author=self.other.username),
+            [self.other_post],
+        )
+
+    def test_search_index_follows_changes(self):
+        """Изменение и удаление поста обновляют индекс."""
+        post = Post.objects.get(pk=self.other_post.pk)
+        post.text = 'Собаки без кошек'
+        post.save()
+        self.assertEqual(self.search(q='котик'), [self.post])
+        Post.objects.get(pk=self.post.pk).delete()
+        self.assertEqual(self.search(q='котик'), [])
+
+    def test_rebuild_search_index_in_batches(self):
+        """Перестроение пачками исправляет расхождения индекса."""
+        Post.objects.filter(pk=self.post.pk).update(text='Собаки в деревне')
+        search.index_many(search.POST_INDEX, [(10 ** 6, 'Котик-призрак')])
+        call_command('rebuild_search_index', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.search(q='котик'), [self.other_post])
+        self.assertEqual(self.search(q='деревне'), [self.post])
+
+    def test_search_cursor_pagination(self):
+        """Результаты поиска листаются курсором по рангу."""
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Котик номер %s' % i)
+            for i in range(12)
+        ])
+        call_command('rebuild_search_index', stdout=StringIO())
+        response = self.client.get(reverse('posts:search'), {'q': 'котик'})
+        first = response.context['page_obj']
+        second = self.client.get(
+            reverse('posts:search'),
+            {'q': 'котик', 'cursor': first.paginator.next_cursor},
+        ).context['page_obj']
+        found = list(first.object_list) + list(second.object_list)
+        self.assertEqual(len(found), 14)
+        self.assertEqual(len(set(found)), 14)
+        for position in (('nan', 1), (1.5, 10 ** 23)):
+            response = self.client.get(reverse('posts:search'), {
+                'q': 'котик', 'cursor': encode_cursor('n', position),
+            })
+            self.assertEqual(
+                response.context['page_obj'].object_list, found[:10]
+            )
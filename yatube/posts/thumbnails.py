@@ -0,0 +1,158 @@
+"""Заблаговременная подготовка миниатюр картинок постов.
+
+Шаблоны берут миниатюры тегом {% thumbnail %}, и первый показ поста
+после загрузки картинки режет её прямо в запросе. Поэтому все размеры
+из THUMBNAIL_SIZES готовятся сразу после сохранения поста в пуле
+потоков, вне цикла запроса, а ленты находят готовые миниатюры
+всей страницы одним запросом к хранилищу ключей.
+
+Кроме JPEG для каждого размера готовятся WebP разной ширины для srcset
+и крошечная размытая заглушка, которая хранится прямо в посте.
+"""
+import base64
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageFilter, ImageOps
+from sorl.thumbnail import default, get_thumbnail
+
+from . import invalidation
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Геометрия и параметры должны совпадать с тегами в шаблонах,
+# иначе sorl посчитает другой ключ и будет резать картинку заново.
+FEED_SIZE = ('560x300', {'crop': 'center', 'upscale': True})
+DETAIL_SIZE = ('560x539', {'crop': 'center', 'upscale': True})
+# Ширины WebP для srcset относительно ширины основного размера.
+VARIANT_SCALES = (0.5, 1, 2)
+VARIANT_FORMAT = 'WEBP'
+PLACEHOLDER_WIDTH = 16
+
+
+def variants(size):
+    """Варианты размера для srcset: [(ширина, геометрия, параметры)]."""
+    geometry, options = size
+    width, height = map(int, geometry.split('x'))
+    return [
+        (
+            int(width * scale),
+            f'{int(width * scale)}x{int(height * scale)}',
+            {**options, 'format': VARIANT_FORMAT},
+        )
+        for scale in VARIANT_SCALES
+    ]
+
+
+THUMBNAIL_SIZES = tuple(
+    job
+    for size in (FEED_SIZE, DETAIL_SIZE)
+    for job in (size, *((geometry, options)
+                        for _, geometry, options in variants(size)))
+)
+
+_executor = None
+
+
+def workers() -> int:
+    """Размер пула; 0 — готовить миниатюры в том же потоке."""
+    return getattr(settings, 'THUMBNAIL_WORKERS', 2)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=workers(),
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def placeholder(file_):
+    """Размытая заглушка картинки в виде data URI."""
+    with file_.open('rb'), Image.open(file_) as image:
+        image.draft('RGB', (PLACEHOLDER_WIDTH * 4, PLACEHOLDER_WIDTH * 4))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        height = max(round(PLACEHOLDER_WIDTH * image.height / image.width), 1)
+        image = image.resize((PLACEHOLDER_WIDTH, height), Image.BILINEAR)
+        image = image.filter(ImageFilter.GaussianBlur(1))
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', quality=40)
+    data = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/jpeg;base64,{data}'
+
+
+def generate(name):
+    """Готовит все миниатюры и заглушку картинки, возвращает число
+    миниатюр."""
+    image = Post(image=name).image
+    for geometry, options in THUMBNAIL_SIZES:
+        get_thumbnail(image, geometry, **options)
+    posts = Post.objects.filter(image=name)
+    posts.update(placeholder=placeholder(image), updated_at=timezone.now())
+    # Ленты и карточки, закешированные до готовности миниатюр,
+    # показывают картинку без srcset и заглушки.
+    for post in posts.only('id', 'author', 'group'):
+        invalidation.invalidate_post(post)
+    return len(THUMBNAIL_SIZES)
+
+
+def _generate_safely(name):
+    # Ошибка не должна ни теряться молча, ни ронять запрос.
+    try:
+        generate(name)
+    except Exception:
+        logger.exception('Не удалось подготовить миниатюры %s', name)
+
+
+def _generate_in_thread(name):
+    # Соединение потока с базой (хранилище ключей sorl) закрывается
+    # за собой, иначе пул копит открытые соединения.
+    try:
+        _generate_safely(name)
+    finally:
+        close_old_connections()
+
+
+def schedule(name):
+    """Ставит подготовку миниатюр в очередь после коммита транзакции."""
+    if not name:
+        return
+
+    def submit():
+        if workers() > 0:
+            _get_executor().submit(_generate_in_thread, name)
+        else:
+            _generate_safely(name)
+
+    transaction.on_commit(submit)
+
+
+def prefetch(posts, size=FEED_SIZE):
+    """Находит готовые миниатюры постов страницы одним запросом.
+
+    Найденная миниатюра кладётся в post.thumbnail, готовые WebP —
+    в post.srcset. Для остальных постов шаблон откатывается к тегу
+    {% thumbnail %}.
+    """
+    posts = [post for post in posts if post.image]
+    if not posts:
+        return
+    sizes = [(None, *size), *variants(size)]
+    found = iter(default.backend.get_cached_thumbnails([
+        (post.image, geometry, options)
+        for post in posts
+        for _, geometry, options in sizes
+    ]))
+    for post in posts:
+        post.thumbnail, *webp = (next(found) for _ in sizes)
+        post.srcset = ', '.join(
+            f'{image.url} {width}w'
+            for (width, _, _), image in zip(sizes[1:], webp) if image
+        )
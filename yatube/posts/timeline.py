@@ -0,0 +1,287 @@
+"""Материализованная лента подписок (fan-out on write).
+
+При публикации поста строки ленты раскладываются всем подписчикам
+автора. Автор, у которого подписчиков стало не меньше
+`TIMELINE_FANOUT_THRESHOLD`, отмечается популярным (Profile.celebrity):
+его посты не раскладываются, а подмешиваются в ленту при чтении.
+Отметка снимается фоновой раскладкой, когда подписчиков становится
+меньше `TIMELINE_FANOUT_LOW_THRESHOLD`.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Max, Q
+
+from .models import Follow, Post, Profile, Timeline
+from .paginator import CursorPaginator
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+# Сколько подписчиков получают посты автора за один проход раскладки.
+FOLLOWERS_CHUNK = 100
+MATERIALIZE_KEY = 'timeline:materialize:{}'
+MATERIALIZE_TIMEOUT = 60 * 60
+
+_executor = None
+
+
+def fanout_threshold() -> int:
+    return getattr(settings, 'TIMELINE_FANOUT_THRESHOLD', 1000)
+
+
+def fanout_low_threshold() -> int:
+    """Ниже этого числа подписчиков посты автора снова раскладываются.
+
+    Зазор между порогами не даёт читателю, который щёлкает подпиской
+    у порога, раз за разом запускать раскладку.
+    """
+    return getattr(
+        settings, 'TIMELINE_FANOUT_LOW_THRESHOLD',
+        fanout_threshold() * 9 // 10,
+    )
+
+
+def workers() -> int:
+    """Размер пула раскладки; 0 — раскладывать после коммита в потоке."""
+    return getattr(settings, 'TIMELINE_WORKERS', 1)
+
+
+def is_celebrity(author_id) -> bool:
+    """Автор слишком популярен, чтобы раскладывать его посты."""
+    return Profile.objects.filter(user_id=author_id, celebrity=True).exists()
+
+
+def celebrity_ids(user):
+    """id популярных авторов, на которых подписан пользователь."""
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__profile__celebrity=True,
+        ).values_list('author_id', flat=True)
+    )
+
+
+def _bulk_insert(entries):
+    Timeline.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out(post):
+    """Добавляет пост в ленты подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_insert(
+        Timeline(
+            user_id=user_id,
+            post_id=post.id,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def fan_out_many(posts):
+    """Раскладывает пачку постов подписчикам их авторов."""
+    authors = {post.author_id for post in posts} - set(
+        Profile.objects.filter(
+            user_id__in={post.author_id for post in posts},
+            celebrity=True,
+        ).values_list('user_id', flat=True)
+    )
+    followers = {}
+    for user_id, author_id in Follow.objects.filter(
+        author_id__in=authors
+    ).values_list('user_id', 'author_id').iterator():
+        followers.setdefault(author_id, []).append(user_id)
+    _bulk_insert(
+        Timeline(
+            user_id=user_id,
+            post_id=post.id,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for post in posts
+        for user_id in followers.get(post.author_id, ())
+    )
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту постами автора после подписки."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'pub_date')
+    _bulk_insert(
+        Timeline(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    Timeline.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def follower_added(author_id):
+    """Отмечает автора популярным, когда подписчиков стало много."""
+    Profile.objects.filter(
+        user_id=author_id,
+        celebrity=False,
+        followers_count__gte=fanout_threshold(),
+    ).update(celebrity=True)
+
+
+def follower_removed(author_id):
+    """Ставит в очередь раскладку постов автора, переставшего быть
+    популярным. До её конца посты подмешиваются при чтении."""
+    demoted = Profile.objects.filter(
+        user_id=author_id,
+        celebrity=True,
+        followers_count__lt=fanout_low_threshold(),
+    ).exists()
+    if demoted and cache.add(
+        MATERIALIZE_KEY.format(author_id), True, MATERIALIZE_TIMEOUT
+    ):
+        transaction.on_commit(lambda: _submit(author_id))
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=workers(),
+            thread_name_prefix='timeline',
+        )
+    return _executor
+
+
+def _materialize_safely(author_id):
+    try:
+        materialize(author_id)
+    except Exception:
+        logger.exception('Не удалось разложить посты автора %s', author_id)
+    finally:
+        cache.delete(MATERIALIZE_KEY.format(author_id))
+        close_old_connections()
+
+
+def _submit(author_id):
+    if workers() > 0:
+        _get_executor().submit(_materialize_safely, author_id)
+    else:
+        _materialize_safely(author_id)
+
+
+def _insert_cross(author_id, posts, user_ids):
+    _bulk_insert(
+        Timeline(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts
+        for user_id in user_ids
+    )
+
+
+def materialize(author_id):
+    """Раскладывает все посты автора подписчикам и снимает отметку
+    популярности.
+
+    Подписчики обрабатываются пачками по FOLLOWERS_CHUNK, каждая
+    пачка коммитится сама. Подписки и посты, появившиеся за время
+    раскладки, дописываются в одной транзакции со снятием отметки.
+    """
+    follows = Follow.objects.filter(author_id=author_id)
+    posts = Post.objects.filter(author_id=author_id)
+    last_follow = follows.aggregate(last=Max('pk'))['last'] or 0
+    last_post = posts.aggregate(last=Max('pk'))['last'] or 0
+    known = list(
+        posts.filter(pk__lte=last_post).values_list('id', 'pub_date')
+    )
+    start = 0
+    while True:
+        chunk = list(follows.filter(
+            pk__gt=start, pk__lte=last_follow
+        ).order_by('pk').values_list('pk', 'user_id')[:FOLLOWERS_CHUNK])
+        if not chunk:
+            break
+        with transaction.atomic():
+            _insert_cross(author_id, known, [user for _, user in chunk])
+        start = chunk[-1][0]
+    with transaction.atomic():
+        demoted = Profile.objects.filter(
+            user_id=author_id,
+            celebrity=True,
+            followers_count__lt=fanout_low_threshold(),
+        ).update(celebrity=False)
+        if not demoted:
+            return
+        _insert_cross(
+            author_id,
+            posts.values_list('id', 'pub_date'),
+            follows.filter(pk__gt=last_follow).values_list(
+                'user_id', flat=True
+            ),
+        )
+        _insert_cross(
+            author_id,
+            posts.filter(pk__gt=last_post).values_list('id', 'pub_date'),
+            follows.values_list('user_id', flat=True),
+        )
+
+
+class TimelinePaginator(CursorPaginator):
+    """Пагинатор ленты подписок.
+
+    Читает строки ленты пользователя и подмешивает посты популярных
+    авторов, на которых он подписан.
+    """
+
+    def __init__(self, user, per_page, **kwargs):
+        self.celebrities = celebrity_ids(user)
+        self.timeline = Timeline.objects.filter(
+            user=user
+        ).select_related('post__author', 'post__group')
+        posts = Post.objects.with_related().filter(
+            Q(id__in=Timeline.objects.filter(user=user).values('post'))
+            | Q(author_id__in=self.celebrities)
+        )
+        super().__init__(posts, per_page, **kwargs)
+
+    def _fetch(self, position, forward, limit):
+        entries = self.keyset(
+            self.timeline, position, forward, limit,
+            keys=('pub_date', 'post_id'),
+        )
+        posts = [entry.post for entry in entries]
+        if not self.celebrities:
+            return posts
+        posts += self.keyset(
+            Post.objects.with_related().filter(
+                author_id__in=self.celebrities
+            ),
+            position, forward, limit,
+        )
+        unique = {post.id: post for post in posts}
+        return sorted(
+            unique.values(),
+            key=self._key,
+            reverse=forward == self.descending,
+        )[:limit]
@@ -1,83 +1,146 @@
 """Подключение модулей."""
+from core.cache import generation
+from core.decorators import anonymous_cache_page
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Page, Paginator
+from django.core.paginator import Page
+from django.db import transaction
 from django.db.models import QuerySet
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 
+from . import following, thumbnails
 from .forms import CommentForm, GroupForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Group, Post, User
+from .invalidation import (INDEX, group_namespace, post_page_namespaces,
+                           profile_namespace)
+from .paginator import CursorPaginator
+from .search import SearchPaginator
+from .timeline import TimelinePaginator
 
 COUNT_POSTS = 10
+COUNT_COMMENTS = 20
 
 
 def paginator_page(request, posts: QuerySet) -> Page:
-    """Функция для пагинации страниц."""
-    paginator = Paginator(posts, COUNT_POSTS)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    """Функция для пагинации страниц по курсору."""
+    paginator = CursorPaginator(posts, COUNT_POSTS)
+    page_obj = paginator.get_page_from_request(request.GET)
+    thumbnails.prefetch(page_obj)
+    return page_obj
 
 
+def comment_page(request, post_id) -> Page:
+    """Страница комментариев поста по курсору, от старых к новым."""
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        COUNT_COMMENTS,
+        ordering=('created', 'id'),
+    )
+    return paginator.get_page_from_request(request.GET)
+
+
+@anonymous_cache_page(lambda: (INDEX,))
 def index(request):
     """Viev-функция главной страницы."""
     template = 'posts/index.html'
-    posts = Post.objects.all()
+    posts = Post.objects.with_related()
     page_obj = paginator_page(request, posts)
     context = {
         'page_obj': page_obj,
         'index': True,
+        'cache_generation': generation(INDEX),
     }
     return render(request, template, context)
 
 
+@anonymous_cache_page(lambda slug: (group_namespace(slug),))
 def group_posts(request, slug):
     """Viev-функция страниц групп."""
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.with_related()
     page_obj = paginator_page(request, posts)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'cache_generation': generation(group_namespace(slug)),
     }
     return render(request, template, context)
 
 
+@anonymous_cache_page(lambda username: (profile_namespace(username),))
 def profile(request, username):
     """Viev-функция для страницы профиля."""
     template = 'posts/profile.html'
-    user = get_object_or_404(User, username=username)
-    following = (not request.user.is_anonymous) and (
-        Follow.objects.filter(
-            user=request.user,
-            author=user
-        ).exists()
+    user = get_object_or_404(
+        User.objects.select_related('profile'),
+        username=username,
     )
-    posts_list = user.posts.all()
+    posts_list = user.posts.with_related()
     page_obj = paginator_page(request, posts_list)
     context = {
         'author': user,
         'page_obj': page_obj,
-        'following': following,
+        'following': following.is_following(request.user, user.pk),
+        'cache_generation': generation(profile_namespace(username)),
+    }
+    return render(request, template, context)
+
+
+def search(request):
+    """Viev-функция поиска по постам."""
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    posts = Post.objects.with_related()
+    group = request.GET.get('group')
+    if group:
+        posts = posts.filter(group__slug=group)
+    author = request.GET.get('author')
+    if author:
+        posts = posts.filter(author__username=author)
+    paginator = SearchPaginator(posts, query, COUNT_POSTS)
+    page_obj = paginator.get_page_from_request(request.GET)
+    thumbnails.prefetch(page_obj)
+    context = {
+        'query': query,
+        'groups': Group.objects.only('title', 'slug'),
+        'page_obj': page_obj,
     }
     return render(request, template, context)
 
 
+@anonymous_cache_page(post_page_namespaces)
 def post_detail(request, post_id):
     """Viev-функция страниц поста."""
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    comment_list = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__profile', 'group'),
+        pk=post_id,
+    )
+    thumbnails.prefetch([post], thumbnails.DETAIL_SIZE)
     form = CommentForm()
     context = {
         'post': post,
-        'comments': comment_list,
+        'comments': comment_page(request, post.pk),
         'form': form,
     }
     return render(request, template, context)
 
 
+@anonymous_cache_page(post_page_namespaces)
+def post_comments(request, post_id):
+    """Следующая порция комментариев поста фрагментом HTML."""
+    template = 'includes/comment_list.html'
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    context = {
+        'post': post,
+        'comments': comment_page(request, post.pk),
+    }
+    return render(request, template, context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     """Viev-функция для создания поста."""
     template = 'posts/create_post.html'
@@ -110,6 +173,7 @@ def group_create(request):
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     """Viev-функция для редактирования поста."""
     template = 'posts/create_post.html'
@@ -137,6 +201,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def post_delete(request, post_id):
     template = 'posts/post_delete.html'
     post = get_object_or_404(Post, pk=post_id)
@@ -154,6 +219,7 @@ def post_delete(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     """Viev-функция для редактирования поста."""
     form = CommentForm(request.POST or None)
@@ -171,8 +237,9 @@ def follow_index(request):
     """Viev-функция для подписок."""
     template = 'posts/follow.html'
     user = request.user
-    posts_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator_page(request, posts_list)
+    paginator = TimelinePaginator(user, COUNT_POSTS)
+    page_obj = paginator.get_page_from_request(request.GET)
+    thumbnails.prefetch(page_obj)
     context = {
         'author': user,
         'page_obj': page_obj,
@@ -182,25 +249,20 @@ def follow_index(request):
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     """Viev-функция для оформления подписки."""
     user = request.user
     follow = get_object_or_404(User, username=username)
     if follow != user:
-        Follow.objects.get_or_create(
-            user=user,
-            author=follow
-        )
+        Follow.objects.follow(user.pk, follow.pk)
     return redirect(reverse('posts:follow_index'))
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     """Viev-функция для отписки."""
     author = get_object_or_404(User, username=username)
-    follow = Follow.objects.filter(
-        user=request.user,
-        author=author,
-    )
-    follow.delete()
+    Follow.objects.unfollow(request.user.pk, author.pk)
     return redirect(reverse('posts:follow_index'))
@@ -0,0 +1,34 @@
+"""Пользователь сессии из кеша вместо запроса к базе."""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+USER_KEY = 'user:{}'
+
+
+def user_cache():
+    return caches[settings.SESSION_CACHE_ALIAS]
+
+
+def invalidate(user_id):
+    user_cache().delete(USER_KEY.format(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который хранит пользователя в кеше сессий.
+
+    Запись сбрасывается сигналами при сохранении и удалении
+    пользователя, в том числе при смене пароля, поэтому хеш сессии
+    проверяется по актуальному паролю.
+    """
+
+    def get_user(self, user_id):
+        cache = user_cache()
+        key = USER_KEY.format(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
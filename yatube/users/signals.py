@@ -0,0 +1,17 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import invalidate
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Второй сброс после коммита: параллельный запрос мог успеть
+    # положить в кеш старую строку.
+    invalidate(instance.pk)
+    transaction.on_commit(lambda: invalidate(instance.pk))
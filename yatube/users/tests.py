@@ -60,3 +60,34 @@ class UsersViewsTests(TestCase):
             response,
             reverse('users:login')
         )
+
+
+class CachedUserTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='cached', password='password123'
+        )
+        self.client.force_login(self.user)
+        self.client.get(reverse('about:author'))
+
+    def test_session_and_user_without_queries(self):
+        """Сессия и пользователь читаются из кеша."""
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('about:author'))
+        self.assertEqual(response.wsgi_request.user, self.user)
+
+    def test_password_change_resets_cache(self):
+        """После смены пароля старая сессия недействительна."""
+        self.user.set_password('new-password123')
+        self.user.save()
+        response = self.client.get(reverse('about:author'))
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    def test_session_from_model_backend_survives(self):
+        """Сессия, открытая через ModelBackend, остаётся действительной."""
+        client = Client()
+        client.force_login(
+            self.user, backend='django.contrib.auth.backends.ModelBackend'
+        )
+        response = client.get(reverse('about:author'))
+        self.assertEqual(response.wsgi_request.user, self.user)
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+from datetime import timedelta
 
 from dotenv import load_dotenv
 
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -55,7 +57,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -83,6 +88,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.feed_cache.feed_cache',
             ],
         },
     },
@@ -143,6 +149,21 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# Без DEBUG collectstatic добавляет к именам хеш содержимого и пишет
+# сжатые копии, core.middleware.StaticFilesMiddleware отдаёт их
+# с вечным кешированием. Файлы без хеша кешируются на STATIC_MAX_AGE.
+if not DEBUG:
+    STATICFILES_STORAGE = (
+        'core.storage.CompressedManifestStaticFilesStorage'
+    )
+STATIC_MAX_AGE = 60
+
+# Сжатие ответов (core.middleware.CompressionMiddleware); brotli —
+# если установлен одноимённый пакет, иначе gzip.
+COMPRESSION_MIN_SIZE = 500
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -150,10 +171,91 @@ LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Общий для всех воркеров кеш: фрагменты шаблонов и хранилище
+# sorl-thumbnail. Сессии и пользователи лежат отдельно, чтобы очистка
+# кеша страниц не разлогинивала и не нагружала базу.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache_backend.SQLiteCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            os.path.join(BASE_DIR, 'cache.sqlite3'),
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 512 * 1024 * 1024,
+        },
+    },
+    'sessions': {
+        'BACKEND': 'core.cache_backend.SQLiteCache',
+        'LOCATION': os.getenv(
+            'SESSION_CACHE_LOCATION',
+            os.path.join(BASE_DIR, 'sessions.sqlite3'),
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
 }
+# Настройки тестов: core.testing.isolated_settings.
+TEST_RUNNER = 'core.runner.TestRunner'
+# Сессии читаются из кеша и пишутся в базу, пользователь сессии
+# берётся из кеша (users.backends.CachedModelBackend).
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sessions'
+# ModelBackend остаётся в списке для сессий, открытых до его замены:
+# django.contrib.auth.get_user не принимает бэкенд не из списка.
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+USER_CACHE_TIMEOUT = 60 * 60
+# Ленты сбрасываются сигналами моделей, время жизни лишь ограничивает
+# размер кеша.
+FEED_CACHE_TIMEOUT = 60 * 60 * 3
+# Страницы для анонимных пользователей, тоже сбрасываются сигналами.
+PAGE_CACHE_TIMEOUT = 60 * 60 * 3
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# Посты авторов с таким числом подписчиков не раскладываются по лентам
+# подписчиков, а подмешиваются в ленту при чтении.
+TIMELINE_FANOUT_THRESHOLD = 1000
+# Посты раскладываются снова, когда подписчиков меньше нижнего порога;
+# раскладка идёт в TIMELINE_WORKERS фоновых потоках (0 — после коммита).
+TIMELINE_FANOUT_LOW_THRESHOLD = 900
+TIMELINE_WORKERS = int(os.getenv('TIMELINE_WORKERS', 1))
+
+# Потоков, готовящих миниатюры после загрузки картинки; 0 — готовить
+# сразу после коммита в том же потоке.
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 2))
+# Загруженные картинки постов: больше этого отбраковываются по
+# заголовку, длинная сторона уменьшается до IMAGE_MAX_DIMENSION.
+IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS = 50_000_000
+IMAGE_MAX_DIMENSION = 2048
+IMAGE_QUALITY = 85
+# Хранилище ключей sorl живёт в общем кеше, ленты ищут миниатюры
+# страницы одним get_many.
+THUMBNAIL_BACKEND = 'core.thumbnails.ThumbnailBackend'
+THUMBNAIL_KVSTORE = 'core.thumbnails.CacheKVStore'
+
+# Профилирование запросов (core.middleware.ProfilingMiddleware):
+# запрос с заголовком X-Profile, подписанным core.profiling.make_token(),
+# или доля случайных запросов получают заголовок Server-Timing.
+PROFILING_HEADER = 'X-Profile'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_BUFFER_SIZE = 1000
+PROFILING_TOKEN_MAX_AGE = 60 * 60 * 24
+
+# Журнал запросов к базе (core.querylog): отпечатки, p95 и планы
+# медленных запросов, сводка — manage.py querylog.
+QUERY_LOG_ENABLED = os.getenv('QUERY_LOG_ENABLED', '') == '1'
+QUERY_LOG_SLOW_MS = 100
+QUERY_LOG_FLUSH_INTERVAL = 10
+
+# JSON API (api): JWT без сессий, страницы по курсору.
+API_ACCESS_TOKEN_LIFETIME = timedelta(minutes=15)
+API_REFRESH_TOKEN_LIFETIME = timedelta(days=1)
+API_PAGE_SIZE = 10
+API_MAX_PAGE_SIZE = 100
@@ -1,4 +1,5 @@
 """Подключение модулей."""
+from core.views import profiling_report
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
@@ -6,6 +7,8 @@ from django.urls import include, path
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('profiling/', profiling_report, name='profiling'),
+    path('api/', include('api.urls', namespace='api')),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),